@@ -1,15 +1,32 @@
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from time import sleep
-from PIL import Image
-from common import Projects, ChartType
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional, TYPE_CHECKING
+from common import Projects, ChartType, PICTURES_PATH
+import deadline
+
+if TYPE_CHECKING:
+    from selenium import webdriver
 
 JIRA_AMD_HOST = os.getenv("JIRA_AMD_HOST", "amdrender.atlassian.net")
-JIRA_AMD_USERNAME = os.environ["JIRA_AMD_USERNAME"]
-JIRA_AMD_PASSWORD = os.environ["JIRA_AMD_PASSWORD"]
+# rest: charts are drawn from jira search results, browser: screenshots of jira dashboards
+CHARTS_MODE = os.getenv("CHARTS_MODE", "rest")
+
+# colors of statuses in pie charts (in order of descending amount of issues)
+CHART_COLORS = [
+    "#0065FF",
+    "#FF5630",
+    "#36B37E",
+    "#FFAB00",
+    "#6554C0",
+    "#00B8D9",
+    "#FF7452",
+    "#57D9A3",
+    "#FFC400",
+    "#8777D9",
+    "#79E2F2",
+    "#97A0AF",
+]
 
 projects_chart_names = {
     Projects.MAYA_RPR: {
@@ -51,29 +68,33 @@ projects_chart_names = {
 }
 
 
-def login(driver: webdriver.Firefox):
+def login(driver: "webdriver.Firefox"):
+    from selenium.webdriver.common.by import By
+
     driver.get("https://id.atlassian.com/login")
-    driver.find_element(By.ID, "username").send_keys(JIRA_AMD_USERNAME)
-    sleep(1)  # to avaid bot protection
+    driver.find_element(By.ID, "username").send_keys(os.environ["JIRA_AMD_USERNAME"])
+    deadline.sleep(1)  # to avaid bot protection
     driver.find_element(By.ID, "login-submit").click()
 
     while not driver.find_elements(By.ID, "password"):
-        sleep(1)
+        deadline.sleep(1)
 
-    sleep(4)
+    deadline.sleep(4)
 
-    driver.find_element(By.ID, "password").send_keys(JIRA_AMD_PASSWORD)
-    sleep(4)  # to avaid bot protection
+    driver.find_element(By.ID, "password").send_keys(os.environ["JIRA_AMD_PASSWORD"])
+    deadline.sleep(4)  # to avaid bot protection
     driver.find_element(By.ID, "login-submit").click()
 
     # waiting for main page to load
     while not driver.find_elements(By.TAG_NAME, "button"):
-        sleep(1)
+        deadline.sleep(1)
 
-    sleep(2)
+    deadline.sleep(2)
 
 
 def _save_chart_screenshot(driver, project: Projects, chart_type: ChartType):
+    from selenium.webdriver.common.by import By
+
     chart_name = projects_chart_names[project][chart_type]
 
     # check wheter chart is available
@@ -97,7 +118,7 @@ def _save_chart_screenshot(driver, project: Projects, chart_type: ChartType):
             ),
         )
     except Exception:
-        sleep(5)
+        deadline.sleep(5)
         chart_el = driver.find_element(
             By.XPATH,
             "//div[text()='{chart_name}']//ancestor::div[6]//descendant::div[@class='piechart-with-legend']".format(
@@ -106,13 +127,15 @@ def _save_chart_screenshot(driver, project: Projects, chart_type: ChartType):
         )
 
     # screen chart box
-    sleep(1)
+    deadline.sleep(1)
     img_name = "pics/chart_{project}_{type}.png".format(
         project=project.value, type=chart_type.value
     )
     chart_el.screenshot(img_name)
 
     # crop screenshot
+    from PIL import Image
+
     img = Image.open(img_name)
     box = (150, 0, img.width - 160, img.height)
     img.crop(box).save(img_name)
@@ -120,11 +143,25 @@ def _save_chart_screenshot(driver, project: Projects, chart_type: ChartType):
     return img_name
 
 
-def export_charts():
+def export_dashboard_charts():
+    from selenium import webdriver
+
     driver = webdriver.Firefox(executable_path="./geckodriver.exe")
     # driver.fullscreen_window()
     driver.set_window_size(1920,1080)
 
+    # browser is closed even if export is cancelled by deadline
+    try:
+        return _export_dashboard_charts(driver)
+    finally:
+        driver.close()
+
+
+def _export_dashboard_charts(driver: "webdriver.Firefox"):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     login(driver)
 
     result_report = {
@@ -166,10 +203,95 @@ def export_charts():
             continue
         result_report[project][chart_type] = img_path
 
-    driver.close()
-
     return result_report
 
 
+def get_statuses_counts(
+    report_date: datetime,
+) -> Dict[Projects, Dict[ChartType, Counter]]:
+    # issues of both dashboards of all projects are requested with one search
+    # {project: {chart type: {status: amount of issues}}}
+    from jira_export import projects_jira_names, _jql_all
+
+    projects_by_name = {projects_jira_names[project]: project for project in projects_chart_names}
+    updates_start = (report_date - timedelta(weeks=2)).strftime("%Y-%m-%d %H:%M")
+
+    jql_request = "project in ({names}) AND (resolution = Unresolved OR updated >= '{start}')".format(
+        names=", ".join(projects_by_name), start=updates_start
+    )
+
+    counts = {
+        project: {chart_type: Counter() for chart_type in ChartType}
+        for project in projects_chart_names
+    }
+    for issue in _jql_all(jql_request, "charts"):
+        project_counts = counts[projects_by_name[issue.project]]
+        if issue.resolution is None:
+            project_counts[ChartType.UNRESOLVED_ISSUES][issue.status] += 1
+        if issue.updated >= updates_start:
+            project_counts[ChartType.ISSUES_UPDATES_2W][issue.status] += 1
+
+    return counts
+
+
+def draw_chart(project: Projects, chart_type: ChartType, statuses: Counter) -> Optional[str]:
+    import plotly.graph_objects as go
+
+    # the same as "No Data Available" on dashboard
+    if not statuses:
+        return None
+
+    labels, values = zip(*statuses.most_common())
+
+    fig = go.Figure(
+        go.Pie(
+            labels=[f"{label} ({value})" for label, value in zip(labels, values)],
+            values=values,
+            marker=dict(colors=CHART_COLORS, line=dict(color="#FFFFFF", width=1)),
+            textinfo="none",
+            sort=False,
+            direction="clockwise",
+        ),
+        layout=go.Layout(
+            height=300,
+            width=600,
+            font_family="Segoe UI",
+            legend=dict(font=dict(size=15)),
+            margin=dict(l=20, r=20, t=20, b=20),
+        ),
+    )
+
+    path = os.path.join(
+        PICTURES_PATH,
+        "chart_{project}_{type}.png".format(project=project.value, type=chart_type.value),
+    )
+    fig.write_image(path)
+    return path
+
+
+def export_rest_charts(report_date: datetime):
+    counts = get_statuses_counts(report_date)
+
+    charts = {}
+    for project in projects_chart_names:
+        # charts of abandoned export aren't drawn
+        deadline.check_cancelled()
+
+        charts[project] = {
+            chart_type: draw_chart(project, chart_type, counts[project][chart_type])
+            for chart_type in ChartType
+        }
+
+    return charts
+
+
+def export_charts(report_date: datetime):
+    # {project: {chart type: path to chart image or None}}
+    if CHARTS_MODE == "browser":
+        return export_dashboard_charts()
+
+    return export_rest_charts(report_date)
+
+
 if __name__ == "__main__":
-    export_charts()
+    print(export_charts(datetime.today()))
@@ -0,0 +1,180 @@
+import os
+import json
+import pickle
+import shutil
+from hashlib import sha1
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from common import TEMPLATE_PATH, WORKING_DIR_PATH, find_files
+import deadline
+
+CHECKPOINTS_PATH = os.getenv("CHECKPOINTS_PATH", "./checkpoints/")
+
+
+def digest(*values) -> str:
+    return sha1(pickle.dumps(values)).hexdigest()
+
+
+def template_digest() -> str:
+    # changed template invalidates all document stages
+    template_hash = sha1()
+    for root, dirs, names in os.walk(TEMPLATE_PATH):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            template_hash.update(os.path.relpath(path, TEMPLATE_PATH).encode("utf-8"))
+            with open(path, "rb") as file:
+                template_hash.update(file.read())
+
+    return template_hash.hexdigest()
+
+
+def _latest_checkpoint_path() -> Optional[str]:
+    # report interrupted on previous day is resumed for its own date
+    if not os.path.exists(CHECKPOINTS_PATH):
+        return None
+
+    latest_path, latest_date = None, None
+    for name in os.listdir(CHECKPOINTS_PATH):
+        state_path = os.path.join(CHECKPOINTS_PATH, name, "state.json")
+        if not os.path.exists(state_path):
+            continue
+
+        with open(state_path, "r") as file:
+            report_date = datetime.fromisoformat(json.load(file)["report_date"])
+
+        if latest_date is None or report_date > latest_date:
+            latest_path, latest_date = os.path.dirname(state_path), report_date
+
+    return latest_path
+
+
+class Checkpoint:
+    # results and artifacts of completed stages of one report (keyed by report day),
+    # each stage is stored with digest of its inputs
+    def __init__(self, report_date: datetime, resume: bool):
+        self.path = os.path.join(CHECKPOINTS_PATH, report_date.strftime("%d-%m-%Y"))
+        self.state_path = os.path.join(self.path, "state.json")
+
+        if resume and not os.path.exists(self.state_path):
+            latest_path = _latest_checkpoint_path()
+            if latest_path is not None:
+                self.path = latest_path
+                self.state_path = os.path.join(self.path, "state.json")
+
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path, "r") as file:
+                self.state = json.load(file)
+            print(f"Resuming report from checkpoint '{self.path}'")
+            return
+
+        if resume:
+            # nothing is removed in resume mode, even if checkpoint isn't found
+            print(
+                f"WARNING: No checkpoint for {report_date.strftime('%d-%m-%Y')}, starting from scratch"
+            )
+        elif os.path.exists(CHECKPOINTS_PATH):
+            # checkpoints of previous reports aren't needed anymore
+            shutil.rmtree(CHECKPOINTS_PATH)
+        os.makedirs(self.path, exist_ok=True)
+
+        # {stage: inputs digest}
+        self.state: Dict[str, Any] = {
+            "report_date": report_date.isoformat(),
+            "stages": {},
+        }
+        self._save_state()
+
+    @property
+    def report_date(self) -> datetime:
+        # resumed report is generated for the date of interrupted one
+        return datetime.fromisoformat(self.state["report_date"])
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.state, file, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    def _stage_path(self, stage: str) -> str:
+        return os.path.join(self.path, stage.replace(" ", "_"))
+
+    def is_done(self, stage: str, inputs: str) -> bool:
+        return self.state["stages"].get(stage) == inputs
+
+    def complete(self, stage: str, inputs: str):
+        self.state["stages"][stage] = inputs
+        self._save_state()
+
+    def save_result(self, stage: str, inputs: str, result: Any):
+        stage_path = self._stage_path(stage)
+        if os.path.exists(stage_path):
+            shutil.rmtree(stage_path)
+        os.makedirs(stage_path)
+
+        # files produced by stage are moved later, so keep their copies
+        files = {}
+        for number, path in enumerate(find_files(result)):
+            artifact = f"{number}{os.path.splitext(path)[1]}"
+            shutil.copyfile(path, os.path.join(stage_path, artifact))
+            files[artifact] = path
+
+        with open(os.path.join(stage_path, "result.pickle"), "wb") as file:
+            pickle.dump((result, files), file)
+
+        self.complete(stage, inputs)
+
+    def load_result(self, stage: str) -> Any:
+        stage_path = self._stage_path(stage)
+
+        with open(os.path.join(stage_path, "result.pickle"), "rb") as file:
+            result, files = pickle.load(file)
+
+        for artifact, path in files.items():
+            shutil.copyfile(os.path.join(stage_path, artifact), path)
+
+        return result
+
+    def call(
+        self,
+        stage: str,
+        inputs: str,
+        function: Callable,
+        *args,
+        is_complete: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        # result of completed stage is reused instead of calling function again
+        if self.is_done(stage, inputs):
+            print(f"Stage '{stage}' is restored from checkpoint")
+            return self.load_result(stage)
+
+        result = function(*args)
+        # result of abandoned stage isn't saved (its files can be removed already)
+        deadline.check_cancelled()
+        # partial result (e.g. some sources were cut by deadline) is repeated on resume
+        if result is not None and (is_complete is None or is_complete(result)):
+            self.save_result(stage, inputs, result)
+
+        return result
+
+    def save_document(self, stage: str, inputs: str, state: Any):
+        # snapshot of the partially filled document after stage
+        stage_path = self._stage_path(stage)
+        if os.path.exists(stage_path):
+            shutil.rmtree(stage_path)
+
+        shutil.copytree(WORKING_DIR_PATH, os.path.join(stage_path, "document"))
+        with open(os.path.join(stage_path, "state.pickle"), "wb") as file:
+            pickle.dump(state, file)
+
+        self.complete(stage, inputs)
+
+    def restore_document(self, stage: str) -> Any:
+        stage_path = self._stage_path(stage)
+
+        if os.path.exists(WORKING_DIR_PATH):
+            shutil.rmtree(WORKING_DIR_PATH)
+        shutil.copytree(os.path.join(stage_path, "document"), WORKING_DIR_PATH)
+
+        with open(os.path.join(stage_path, "state.pickle"), "rb") as file:
+            return pickle.load(file)
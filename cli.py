@@ -0,0 +1,220 @@
+import sys
+import atexit
+import argparse
+import builtins
+import importlib
+import importlib.util
+import threading
+from time import perf_counter
+from datetime import datetime
+from typing import Dict, Tuple
+
+REPORT_DATA_PATH = "./report_data.pickle"
+SOURCES = ["jira", "github", "jenkins", "confluence"]
+# amount of the slowest modules printed by import profile
+IMPORT_PROFILE_LIMIT = 25
+
+
+def enable_import_profile():
+    # {module: (cumulative seconds, self seconds)}
+    timings: Dict[str, Tuple[float, float]] = {}
+    # time spent in nested imports, separate for each thread
+    local = threading.local()
+
+    def timed_import(name: str, do_import):
+        if name in sys.modules:
+            return do_import()
+
+        if not hasattr(local, "stack"):
+            local.stack = [0.0]
+        local.stack.append(0.0)
+
+        start = perf_counter()
+        try:
+            return do_import()
+        finally:
+            elapsed = perf_counter() - start
+            nested = local.stack.pop()
+            local.stack[-1] += elapsed
+            if name not in timings:
+                timings[name] = (elapsed, elapsed - nested)
+
+    original_import = builtins.__import__
+    original_import_module = importlib.import_module
+
+    def profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+        full_name = name
+        if level > 0 and globals:
+            # relative import inside a package
+            full_name = importlib.util.resolve_name(
+                "." * level + name, globals.get("__package__")
+            )
+
+        return timed_import(
+            full_name, lambda: original_import(name, globals, locals, fromlist, level)
+        )
+
+    def profiled_import_module(name, package=None):
+        return timed_import(name, lambda: original_import_module(name, package))
+
+    builtins.__import__ = profiled_import
+    importlib.import_module = profiled_import_module
+
+    def print_import_profile():
+        print(f"\nImport profile (top {IMPORT_PROFILE_LIMIT} by cumulative time):")
+        print(f"{'cumulative, ms':>15} {'self, ms':>10}  module")
+        slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (cumulative, own) in slowest[:IMPORT_PROFILE_LIMIT]:
+            print(f"{cumulative * 1000:>15.1f} {own * 1000:>10.1f}  {name}")
+
+    atexit.register(print_import_profile)
+
+
+def report_command(args):
+    import main
+
+    main.main(resume=args.resume)
+
+
+def fetch_command(args):
+    import memo
+    import fixtures
+    import snapshots
+    from common import Service
+    from credentials import validate_credentials
+    from prefetch import prefetch_report_data, load_report_data, save_report_data
+
+    services = [Service[source.upper()] for source in args.source]
+
+    memo.reset()
+
+    if not fixtures.is_replaying() and not validate_credentials(
+        services, check_browser=False
+    ):
+        exit(-1)
+
+    report_date = fixtures.report_date(datetime.now())
+
+    # sources of another day can't be mixed (report date, links and period are shared by all of them)
+    saved_data = load_report_data(args.output)
+    if (
+        saved_data is not None
+        and set(services) != set(Service)
+        and saved_data.report_date.date() != report_date.date()
+        and not args.force
+    ):
+        print(
+            "ERROR: Report data '{path}' was fetched on {saved_date}, fetch all sources or use --force to refresh only {sources}!".format(
+                path=args.output,
+                saved_date=saved_data.report_date.strftime("%d-%m-%Y"),
+                sources=", ".join(args.source),
+            )
+        )
+        exit(-1)
+
+    data = prefetch_report_data(report_date, services=services)
+
+    # only just fetched values are recorded for the report date
+    # (previously fetched sources can be from another day)
+    if not fixtures.is_replaying():
+        snapshots.update_snapshots(data)
+
+    # refresh only requested sources in previously fetched data
+    if saved_data is not None:
+        saved_data.update(data, services)
+        saved_data.snapshots = data.snapshots
+        data = saved_data
+
+    save_report_data(data, args.output)
+    print(f"Report data saved to '{args.output}'")
+
+    memo.print_stats()
+
+
+def render_command(args):
+    import main
+    from checkpoint import Checkpoint
+    from prefetch import load_report_data
+
+    data = load_report_data(args.input)
+    if data is None:
+        print(f"ERROR: Report data '{args.input}' not found! Run 'fetch' command first.")
+        exit(-1)
+
+    deadline = main.create_deadline()
+    main.render_report(data, deadline, Checkpoint(data.report_date, args.resume))
+    deadline.finish()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Weekly QA report generator")
+    parser.add_argument(
+        "--import-profile",
+        action="store_true",
+        help="print import time of each module on exit",
+    )
+    fixtures_group = parser.add_mutually_exclusive_group()
+    fixtures_group.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record all responses and browser charts to the fixtures bundle",
+    )
+    fixtures_group.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="generate report offline from the recorded fixtures bundle",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="fetch data and generate report")
+    report_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip stages completed by interrupted run (if their inputs didn't change)",
+    )
+    report_parser.set_defaults(handler=report_command)
+
+    fetch_parser = subparsers.add_parser(
+        "fetch", help="fetch report data from the specified sources and save it"
+    )
+    fetch_parser.add_argument(
+        "--source", nargs="+", choices=SOURCES, default=SOURCES, help="sources to fetch"
+    )
+    fetch_parser.add_argument("--output", default=REPORT_DATA_PATH)
+    fetch_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="refresh some sources in data fetched on another day (report date is moved to today)",
+    )
+    fetch_parser.set_defaults(handler=fetch_command)
+
+    render_parser = subparsers.add_parser(
+        "render", help="generate report from previously fetched data"
+    )
+    render_parser.add_argument("--input", default=REPORT_DATA_PATH)
+    render_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip stages completed by interrupted run (if their inputs didn't change)",
+    )
+    render_parser.set_defaults(handler=render_command)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.import_profile:
+        enable_import_profile()
+
+    if args.record or args.replay:
+        import fixtures
+
+        if args.record:
+            fixtures.configure("record", args.record)
+        else:
+            fixtures.configure("replay", args.replay)
+
+    args.handler(args)
@@ -1,5 +1,7 @@
+import os
 from dataclasses import dataclass
 from enum import Enum
+from typing import Any, List
 
 TEMPLATE_PATH = "./template/"
 WORKING_DIR_PATH = "./tmp_template/"
@@ -43,3 +45,22 @@ class SummaryTableColumn(Enum):
 class IssueType(Enum):
     BLOCKER=1
     CRITICAL=2
+
+
+class Service(Enum):
+    JIRA = 1
+    GITHUB = 2
+    JENKINS = 3
+    CONFLUENCE = 4
+
+
+def find_files(value: Any) -> List[str]:
+    # paths of existing files in (nested) exporter result
+    if isinstance(value, dict):
+        return [path for item in value.values() for path in find_files(item)]
+    elif isinstance(value, (list, tuple)):
+        return [path for item in value for path in find_files(item)]
+    elif isinstance(value, str) and os.path.isfile(value):
+        return [value]
+
+    return []
@@ -1,15 +1,13 @@
-import os
-import requests
 import json
 from http import HTTPStatus
 from lxml import html
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, List
 from copy import deepcopy
-from common import Projects
+from common import Projects, Service
 from calendar import THURSDAY
-
-CONFLUENCE_TOKEN = os.environ["CONFLUENCE_TOKEN"]
+import http_client
+from memo import memoize
 
 projects_confluence_names = {
     Projects.MAYA_RPR: "RPR Maya",
@@ -25,39 +23,26 @@ projects_confluence_names = {
 }
 
 
-def validate_token():
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CONFLUENCE_TOKEN}",
-    }
-
-    response = requests.get(
-        "https://luxproject.luxoft.com/confluence/rest/api/user/current",
-        headers=headers,
+def validate_token() -> bool:
+    # bypass response cache, credentials should be checked by server
+    response = http_client.get_session(Service.CONFLUENCE).get(
+        "https://luxproject.luxoft.com/confluence/rest/api/user/current"
     )
 
     if response.json()['type'] == "anonymous": 
         print("ERROR: Confluence token 'CONFLUENCE_TOKEN' is invalid!")
-        exit(-1)
-
+        return False
 
-# validate token on module's load
-validate_token()
+    return True
 
 
 def _request_projects_statuses_page(report_date: datetime) -> html.Element:
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CONFLUENCE_TOKEN}",
-    }
-
     url = "https://luxproject.luxoft.com/confluence/rest/api/content"
 
     report_title = f"Thursday weekly {report_date.strftime('%d/%m/%Y')}"
 
-    response = requests.get(
-        f"{url}/?title={report_title}&expand=body.storage",
-        headers=headers,
+    response = http_client.get(
+        Service.CONFLUENCE, f"{url}/?title={report_title}&expand=body.storage"
     )
 
     results = response.json()['results']
@@ -70,7 +55,8 @@ def _request_projects_statuses_page(report_date: datetime) -> html.Element:
     return html.fromstring(page_content)
 
 
-def _get_projects_info(report_date: datetime):
+@memoize
+def get_projects_info(report_date: datetime):
     tree = _request_projects_statuses_page(report_date)
 
     projects_info: Dict = {}
@@ -123,27 +109,29 @@ def _get_projects_info(report_date: datetime):
     return projects_info
 
 
-def get_main_tasks(projects_info) -> set:
-    main_tasks = set()
+def get_main_tasks(projects_info) -> List[str]:
+    # unique tasks in order of projects (set order differs between runs)
+    main_tasks: List[str] = []
 
     for project in projects_info:
         for task in projects_info.get(project):
             if task.get("status") == "complete" and task.get("priority") == "high":
-                main_tasks.add(task.get("description"))
+                if task.get("description") not in main_tasks:
+                    main_tasks.append(task.get("description"))
 
     return main_tasks
 
 
-def get_tasks(report_date: datetime):
+def get_tasks_report_dates(report_date: datetime):
     offset = (report_date.weekday() - THURSDAY) % 7
     last_thursday = report_date - timedelta(days=offset)
 
     previous_thursday = last_thursday - timedelta(weeks=1)
 
-    # get info about projects on this week and previous
-    old_projects_info = _get_projects_info(report_date=previous_thursday)
-    new_projects_info = _get_projects_info(report_date=last_thursday)
+    return previous_thursday, last_thursday
+
 
+def merge_tasks(old_projects_info: Dict, new_projects_info: Dict):
     # combine info
     # filter previous week tasks (only completed)
 
@@ -160,7 +148,20 @@ def get_tasks(report_date: datetime):
     return all_projects_info
 
 
+def get_tasks(report_date: datetime):
+    previous_thursday, last_thursday = get_tasks_report_dates(report_date)
+
+    # get info about projects on this week and previous
+    old_projects_info = get_projects_info(report_date=previous_thursday)
+    new_projects_info = get_projects_info(report_date=last_thursday)
+
+    return merge_tasks(old_projects_info, new_projects_info)
+
+
 if __name__ == "__main__":
+    if not validate_token():
+        exit(-1)
+
     # Tasks
     print("Tasks:")
     tasks = get_tasks(datetime.today())
@@ -0,0 +1,55 @@
+import os
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from requests import RequestException
+from common import Service
+
+# modules with validate_token() of each service (imported only for checked services)
+SERVICE_MODULES = {
+    Service.JIRA: "jira_export",
+    Service.GITHUB: "github_export",
+    Service.JENKINS: "jenkins_export",
+    Service.CONFLUENCE: "confluence_export",
+}
+
+# credentials which are used only by browser logins (can be checked only locally)
+BROWSER_ENV_VARS = ["JENKINS_PASSWORD"]
+# jira dashboards are opened in browser only in browser charts mode
+JIRA_BROWSER_ENV_VARS = ["JIRA_AMD_USERNAME", "JIRA_AMD_PASSWORD"]
+
+
+def _validate_service(service: Service) -> bool:
+    try:
+        return importlib.import_module(SERVICE_MODULES[service]).validate_token()
+    except KeyError as e:
+        print(f"ERROR: Environment variable {e} for {service.name.capitalize()} isn't set!")
+    except RequestException as e:
+        print(f"ERROR: {service.name.capitalize()} credentials can't be validated: {e}")
+
+    return False
+
+
+def validate_credentials(
+    services: Iterable[Service] = tuple(Service), check_browser: bool = True
+) -> bool:
+    valid = True
+
+    if check_browser:
+        from charts_export import CHARTS_MODE
+
+        browser_env_vars = BROWSER_ENV_VARS
+        if CHARTS_MODE == "browser":
+            browser_env_vars = JIRA_BROWSER_ENV_VARS + browser_env_vars
+
+        for env_var in browser_env_vars:
+            if env_var not in os.environ:
+                print(f"ERROR: Environment variable '{env_var}' isn't set!")
+                valid = False
+
+    # check all services at once
+    services = list(services)
+    with ThreadPoolExecutor(max_workers=len(services)) as executor:
+        results = list(executor.map(_validate_service, services))
+
+    return valid and all(results)
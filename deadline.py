@@ -0,0 +1,131 @@
+import time
+import threading
+import contextvars
+from time import monotonic
+from concurrent.futures import Executor, Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Set
+
+
+class Cancelled(Exception):
+    # raised in work which was abandoned by deadline
+    pass
+
+
+# event of the stage which current work belongs to (set when stage is abandoned)
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "cancel_event", default=None
+)
+
+
+def check_cancelled():
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise Cancelled()
+
+
+def sleep(seconds: float):
+    # wait which is interrupted when stage is abandoned
+    event = _cancel_event.get()
+    if event is None:
+        time.sleep(seconds)
+    else:
+        event.wait(seconds)
+
+    check_cancelled()
+
+
+def cancellable(event: threading.Event, function: Callable, *args) -> Any:
+    # function (and work submitted by it) stops when event is set
+    token = _cancel_event.set(event)
+    try:
+        return function(*args)
+    finally:
+        _cancel_event.reset(token)
+
+
+def submit(executor: Executor, function: Callable, *args) -> Future:
+    # workers are cancelled together with the stage which submitted them
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+class Deadline:
+    def __init__(self, seconds: float, stage_shares: Dict[str, float], default_share: float):
+        self.seconds = seconds
+        self.stage_shares = stage_shares
+        self.default_share = default_share
+        self.started_at = monotonic()
+        # {stage: elapsed seconds}
+        self.elapsed: Dict[str, float] = {}
+        self.overruns: Dict[str, float] = {}
+        # stages which didn't finish in time and got default result
+        self.cancelled: Set[str] = set()
+        self._stage: Optional[str] = None
+        self._stage_started_at = 0.0
+
+    def remaining(self) -> float:
+        return max(0.0, self.seconds - (monotonic() - self.started_at))
+
+    def stage_slice(self, stage: str) -> float:
+        return self.seconds * self.stage_shares.get(stage, self.default_share)
+
+    def stage_timeout(self, stage: str) -> float:
+        # stage can't use more than its slice and more than the time left for the whole run
+        return min(self.stage_slice(stage), self.remaining())
+
+    def start_stage(self, stage: str):
+        self._finish_stage()
+        self._stage = stage
+        self._stage_started_at = monotonic()
+
+    def _finish_stage(self):
+        if self._stage is None:
+            return
+
+        elapsed = monotonic() - self._stage_started_at
+        self.elapsed[self._stage] = elapsed
+
+        stage_slice = self.stage_slice(self._stage)
+        if elapsed > stage_slice:
+            self.overruns[self._stage] = elapsed - stage_slice
+            print(
+                f"WARNING: stage '{self._stage}' took {elapsed:.1f}s, which is over its {stage_slice:.1f}s slice"
+            )
+
+        self._stage = None
+
+    def finish(self):
+        self._finish_stage()
+
+        total = monotonic() - self.started_at
+        if total > self.seconds:
+            print(f"WARNING: report took {total:.1f}s, deadline was {self.seconds:.1f}s")
+        if self.overruns:
+            print(
+                "Stages over their time slice: "
+                + ", ".join(
+                    f"{stage} (+{overrun:.1f}s)" for stage, overrun in self.overruns.items()
+                )
+            )
+
+    def run(self, stage: str, function: Callable, *args, default: Any = None) -> Any:
+        # run function in background and cancel it when stage time is over
+        timeout = self.stage_timeout(stage)
+        future: Future = Future()
+        cancel_event = threading.Event()
+
+        def target():
+            try:
+                future.set_result(cancellable(cancel_event, function, *args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=target, name=f"stage-{stage}", daemon=True).start()
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # requests, waits and checkpoint of abandoned work stop at the next check
+            cancel_event.set()
+            self.cancelled.add(stage)
+            print(f"WARNING: '{stage}' didn't finish in {timeout:.1f}s and was cancelled")
+            return default
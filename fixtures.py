@@ -0,0 +1,218 @@
+import io
+import os
+import json
+import pickle
+import shutil
+import threading
+from hashlib import sha1
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from common import find_files
+import deadline
+
+# version of the bundle layout, bundles of other versions can't be replayed
+FIXTURES_FORMAT_VERSION = 1
+
+FIXTURES_MODE = os.getenv("FIXTURES_MODE", "")  # "record", "replay" or empty
+FIXTURES_PATH = os.getenv("FIXTURES_PATH", "./fixtures/")
+
+# credentials aren't used in replay, but exporters expect them to be set
+CREDENTIALS_ENV_VARS = [
+    "JIRA_USERNAME",
+    "JIRA_TOKEN",
+    "JIRA_AMD_USERNAME",
+    "JIRA_AMD_PASSWORD",
+    "JENKINS_USERNAME",
+    "JENKINS_TOKEN",
+    "JENKINS_PASSWORD",
+    "GITHUB_TOKEN",
+    "CONFLUENCE_TOKEN",
+]
+
+# headers which describe the transferred (not the decoded) body
+SKIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+_manifest: Optional[Dict] = None
+_lock = threading.Lock()
+
+
+def configure(mode: str, path: str):
+    global FIXTURES_MODE, FIXTURES_PATH, _manifest
+
+    FIXTURES_MODE = mode
+    FIXTURES_PATH = path
+    _manifest = None
+
+    if is_replaying():
+        for env_var in CREDENTIALS_ENV_VARS:
+            os.environ.setdefault(env_var, "replay")
+
+
+def is_recording() -> bool:
+    return FIXTURES_MODE == "record"
+
+
+def is_replaying() -> bool:
+    return FIXTURES_MODE == "replay"
+
+
+# options from environment are applied the same way as --record/--replay ones
+configure(FIXTURES_MODE, FIXTURES_PATH)
+
+
+def _manifest_path() -> str:
+    return os.path.join(FIXTURES_PATH, "manifest.json")
+
+
+def _load_manifest() -> Dict:
+    global _manifest
+
+    if _manifest is not None:
+        return _manifest
+
+    if is_recording():
+        # every recording starts a new bundle
+        if os.path.exists(FIXTURES_PATH):
+            shutil.rmtree(FIXTURES_PATH)
+        os.makedirs(os.path.join(FIXTURES_PATH, "responses"))
+        os.makedirs(os.path.join(FIXTURES_PATH, "calls"))
+        _manifest = {
+            "version": FIXTURES_FORMAT_VERSION,
+            "report_date": None,
+            "responses": {},
+            "calls": {},
+        }
+        return _manifest
+
+    if not os.path.exists(_manifest_path()):
+        print(f"ERROR: Fixtures bundle '{FIXTURES_PATH}' not found!")
+        exit(-1)
+
+    with open(_manifest_path(), "r") as file:
+        manifest = json.load(file)
+
+    if manifest["version"] != FIXTURES_FORMAT_VERSION:
+        print(
+            f"ERROR: Fixtures bundle version {manifest['version']} isn't supported, record it again!"
+        )
+        exit(-1)
+
+    _manifest = manifest
+    return _manifest
+
+
+def _save_manifest():
+    with open(_manifest_path(), "w") as file:
+        json.dump(_manifest, file, indent=4, sort_keys=True)
+
+
+def _request_key(request: requests.PreparedRequest) -> str:
+    # credentials aren't part of the key, so bundle can be replayed with any of them
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return sha1(f"{request.method}\n{request.url}\n".encode("utf-8") + body).hexdigest()
+
+
+def report_date(live_report_date: datetime) -> datetime:
+    # replayed report is generated for the same date as recorded one
+    with _lock:
+        if is_recording():
+            _load_manifest()["report_date"] = live_report_date.isoformat()
+            _save_manifest()
+        elif is_replaying():
+            return datetime.fromisoformat(_load_manifest()["report_date"])
+
+    return live_report_date
+
+
+def record_response(request: requests.PreparedRequest, response: requests.Response):
+    key = _request_key(request)
+    body = response.content
+
+    with _lock:
+        manifest = _load_manifest()
+        with open(os.path.join(FIXTURES_PATH, "responses", key), "wb") as file:
+            file.write(body)
+        manifest["responses"][key] = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in SKIPPED_HEADERS
+            },
+        }
+        _save_manifest()
+
+    # body is already read, let streaming consumers read it once more
+    response.raw = io.BytesIO(body)
+
+
+def replay_response(request: requests.PreparedRequest) -> requests.Response:
+    key = _request_key(request)
+
+    with _lock:
+        entry = _load_manifest()["responses"].get(key)
+
+    if entry is None:
+        print(f"ERROR: No recorded response for '{request.method} {request.url}'!")
+        exit(-1)
+
+    with open(os.path.join(FIXTURES_PATH, "responses", key), "rb") as file:
+        body = file.read()
+
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = entry["url"]
+    response.request = request
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def replayable(name: str, function: Callable, *args) -> Any:
+    # browser exports don't go through http client,
+    # so their results and produced files are stored instead of responses
+    if is_replaying():
+        with _lock:
+            call = _load_manifest()["calls"].get(name)
+
+        if call is None:
+            print(f"ERROR: No recorded result of '{name}'!")
+            exit(-1)
+
+        for artifact, path in call["files"].items():
+            shutil.copyfile(os.path.join(FIXTURES_PATH, "calls", artifact), path)
+
+        with open(os.path.join(FIXTURES_PATH, "calls", f"{name}.pickle"), "rb") as file:
+            return pickle.load(file)
+
+    result = function(*args)
+    deadline.check_cancelled()
+
+    if is_recording():
+        files = find_files(result)
+
+        with _lock:
+            manifest = _load_manifest()
+            calls_path = os.path.join(FIXTURES_PATH, "calls")
+
+            artifacts = {}
+            for number, path in enumerate(files):
+                artifact = f"{name}_{number}{os.path.splitext(path)[1]}"
+                shutil.copyfile(path, os.path.join(calls_path, artifact))
+                artifacts[artifact] = path
+
+            with open(os.path.join(calls_path, f"{name}.pickle"), "wb") as file:
+                pickle.dump(result, file)
+
+            manifest["calls"][name] = {"files": artifacts}
+            _save_manifest()
+
+    return result
@@ -1,11 +1,16 @@
 import os
-import requests
 import json
 from datetime import datetime, timedelta
-from common import Projects, Link
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from common import Projects, Link, Service
 from http import HTTPStatus
+import http_client
+from memo import memoize
 
-GITHUB_TOKEN = os.environ["GITHUB_TOKEN"]
+# rest: lists of pull requests per repository, graphql: one query for all repositories
+GITHUB_BACKEND = os.getenv("GITHUB_BACKEND", "rest")
+# open pull requests are shown only among this amount of the last updated ones (of any state)
+OPEN_PRS_WINDOW = 100
 
 projects_info = {
     Projects.MAYA_RPR: {
@@ -43,40 +48,266 @@ projects_info = {
 }
 
 
-def request_pull_requests_list(project: Projects, report_date: datetime):
-    report_start_date = report_date - timedelta(weeks=2)
+def validate_token() -> bool:
+    # rate limit request is cheap and isn't counted against the rate limit
+    # (bypass response cache, credentials should be checked by server)
+    response = http_client.get_session(Service.GITHUB).get(
+        "https://api.github.com/rate_limit"
+    )
 
-    owner = projects_info[project]["owner"]
-    name = projects_info[project]["name"]
+    if response.status_code == HTTPStatus.UNAUTHORIZED:
+        print("ERROR: Github token 'GITHUB_TOKEN' is invalid!")
+        return False
+
+    return True
+
+
+def _parse_github_datetime(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def _request_pages(url: str, stop: Optional[Callable[[dict], bool]] = None) -> Iterator[dict]:
+    # items of all pages of github list (pages are linked by "next" in Link header),
+    # the rest pages aren't requested after the first item matching stop
+    while url:
+        response = http_client.get(Service.GITHUB, url)
+
+        if response.status_code == HTTPStatus.UNAUTHORIZED:
+            print("ERROR: Github token 'GITHUB_TOKEN' is invalid!")
+            exit(-1)
+
+        for item in json.loads(response.text):
+            if stop is not None and stop(item):
+                return
+            yield item
+
+        url = response.links.get("next", {}).get("url")
+
+
+@memoize
+def get_pull_requests_index(owner: str, name: str, report_date: datetime) -> List[dict]:
+    # pull requests of repository which are shown in report: open ones among the recently
+    # updated and merged since the report start (several projects can share a repository,
+    # so index is per repository)
+    report_start_date = report_date - timedelta(weeks=2)
 
     url = f"https://api.github.com/repos/{owner}/{name}/pulls?state=all&sort=updated&direction=desc&per_page=100"
-    response = requests.get(
-        url,
-        headers={"Authorization": f"Bearer {GITHUB_TOKEN}"},
+
+    # pull request merged in report period was updated after report start,
+    # so pages are requested until the first one updated before it (but not before
+    # the end of the open pull requests window)
+    pull_requests = []
+    for position, pr in enumerate(_request_pages(url)):
+        updated_before_start = (
+            _parse_github_datetime(pr["updated_at"]).date() < report_start_date.date()
+        )
+        if position >= OPEN_PRS_WINDOW and updated_before_start:
+            break
+
+        if pr["state"] == "open":
+            if position < OPEN_PRS_WINDOW:
+                pull_requests.append(pr)
+        elif (
+            pr.get("merged_at", None) is not None
+            and _parse_github_datetime(pr["merged_at"]).date() >= report_start_date.date()
+        ):
+            pull_requests.append(pr)
+
+    # only fields used in report are kept (in order of the last update)
+    return [
+        {
+            "number": pr["number"],
+            "title": pr["title"],
+            "state": pr["state"],
+            "html_url": pr["html_url"],
+            "merged_at": pr.get("merged_at", None),
+            "updated_at": pr["updated_at"],
+        }
+        for pr in sorted(pull_requests, key=lambda pr: pr["updated_at"], reverse=True)
+    ]
+
+
+def _get_merged_query(owner: str, name: str, report_date: datetime) -> str:
+    # the same search as on github page of merged pull requests
+    since_date = report_date - timedelta(weeks=2)
+
+    return "repo:{owner}/{name} is:pr is:merged merged:{from_date}..{to_datetime}".format(
+        owner=owner,
+        name=name,
+        from_date=since_date.strftime("%Y-%m-%d"),
+        to_datetime=report_date.strftime("%Y-%m-%dT%H:%M"),
+    )
+
+
+def _request_merged_count(repository: Tuple[str, str], report_date: datetime) -> int:
+    # only total of search is needed, so the smallest page is requested
+    owner, name = repository
+
+    response = http_client.get(
+        Service.GITHUB,
+        "https://api.github.com/search/issues",
+        params={"q": _get_merged_query(owner, name, report_date), "per_page": 1},
     )
 
     if response.status_code == HTTPStatus.UNAUTHORIZED:
         print("ERROR: Github token 'GITHUB_TOKEN' is invalid!")
         exit(-1)
 
-    data = json.loads(response.text)
-
-    # filter pull requests (open or updated in last two weeks)
-    pull_requests = list(
-        filter(
-            (
-                lambda pr: pr["state"] == "open"
-                or (
-                    pr.get("merged_at", None) is not None
-                    and datetime.strptime(pr["merged_at"], "%Y-%m-%dT%H:%M:%SZ").date()
-                    >= report_start_date.date()
-                )
-            ),
-            data,
+    # search is rejected (422) for unknown repository and limited (403) by secondary rate limit
+    if response.status_code != HTTPStatus.OK:
+        print(
+            "ERROR: Github search of merged pull requests of {owner}/{name} failed: {status} {reason}".format(
+                owner=owner, name=name, status=response.status_code, reason=response.reason
+            )
+        )
+        exit(-1)
+
+    return json.loads(response.text)["total_count"]
+
+
+@memoize
+def get_merged_counts(report_date: datetime) -> Dict[Tuple[str, str], int]:
+    # amounts of merged pull requests of all repositories (the same as on linked pages),
+    # searches are sent one by one (search is limited to 30 requests per minute
+    # and concurrent requests trigger secondary rate limits)
+    repositories = sorted(
+        {(info["owner"], info["name"]) for info in projects_info.values()}
+    )
+
+    return {
+        repository: _request_merged_count(repository, report_date)
+        for repository in repositories
+    }
+
+
+PULL_REQUEST_FIELDS = "number title state url updatedAt mergedAt"
+# the next page of connection is requested after the cursor of the previous one
+PAGE_FIELDS = "pageInfo { hasNextPage endCursor }"
+
+
+def _request_graphql(subqueries: List[str]) -> dict:
+    response = http_client.post(
+        Service.GITHUB,
+        "https://api.github.com/graphql",
+        json={"query": "query {\n" + "\n".join(subqueries) + "\n}"},
+    )
+
+    if response.status_code == HTTPStatus.UNAUTHORIZED:
+        print("ERROR: Github token 'GITHUB_TOKEN' is invalid!")
+        exit(-1)
+
+    # body of failed request can be html page (502) or secondary rate limit message (403)
+    if response.status_code != HTTPStatus.OK:
+        print(
+            "ERROR: Github GraphQL query failed: {status} {reason}".format(
+                status=response.status_code, reason=response.reason
+            )
         )
+        exit(-1)
+
+    result = json.loads(response.text)
+    if result.get("errors"):
+        print(f"ERROR: Github GraphQL query failed: {result['errors'][0]['message']}")
+        exit(-1)
+
+    return result["data"]
+
+
+@memoize
+def get_graphql_index(report_date: datetime) -> Dict[Tuple[str, str], dict]:
+    # open and merged pull requests of all repositories with one request per page
+    # {(owner, name): {"pull_requests": [pull request], "merged_count": int}}
+    repositories = sorted(
+        {(info["owner"], info["name"]) for info in projects_info.values()}
     )
 
-    return pull_requests
+    def open_subquery(i: int, after: str) -> str:
+        # the window of the last updated pull requests (of any state) is one page
+        owner, name = repositories[i]
+        return 'open{i}: repository(owner: {owner}, name: {name}) {{ pullRequests(first: {window}, orderBy: {{field: UPDATED_AT, direction: DESC}}) {{ nodes {{ {fields} }} }} }}'.format(
+            i=i,
+            owner=json.dumps(owner),
+            name=json.dumps(name),
+            window=OPEN_PRS_WINDOW,
+            fields=PULL_REQUEST_FIELDS,
+        )
+
+    def merged_subquery(i: int, after: str) -> str:
+        owner, name = repositories[i]
+        return "merged{i}: search(query: {query}, type: ISSUE, first: 100{after}) {{ issueCount nodes {{ ... on PullRequest {{ {fields} }} }} {page} }}".format(
+            i=i,
+            query=json.dumps(_get_merged_query(owner, name, report_date)),
+            after=after,
+            fields=PULL_REQUEST_FIELDS,
+            page=PAGE_FIELDS,
+        )
+
+    # {alias: nodes of all pages}, only connections with next pages are requested again
+    nodes: Dict[str, List[dict]] = {}
+    merged_counts: Dict[int, int] = {}
+    pending: Dict[Tuple[str, int], Optional[str]] = {
+        (kind, i): None for i in range(len(repositories)) for kind in ("open", "merged")
+    }
+    while pending:
+        subqueries = [
+            (open_subquery if kind == "open" else merged_subquery)(
+                i, "" if cursor is None else f", after: {json.dumps(cursor)}"
+            )
+            for (kind, i), cursor in pending.items()
+        ]
+        data = _request_graphql(subqueries)
+
+        next_pending = {}
+        for kind, i in pending:
+            connection = data[f"{kind}{i}"]
+            if kind == "open":
+                nodes[f"open{i}"] = [
+                    pr for pr in connection["pullRequests"]["nodes"] if pr["state"] == "OPEN"
+                ]
+                continue
+
+            merged_counts[i] = connection["issueCount"]
+            nodes.setdefault(f"merged{i}", []).extend(connection["nodes"])
+            if connection["pageInfo"]["hasNextPage"]:
+                next_pending[(kind, i)] = connection["pageInfo"]["endCursor"]
+        pending = next_pending
+
+    def to_rest(pr: dict) -> dict:
+        # the same fields as in rest index (merged pull requests are closed ones)
+        return {
+            "number": pr["number"],
+            "title": pr["title"],
+            "state": "open" if pr["state"] == "OPEN" else "closed",
+            "html_url": pr["url"],
+            "merged_at": pr["mergedAt"],
+            "updated_at": pr["updatedAt"],
+        }
+
+    index = {}
+    for i, repository in enumerate(repositories):
+        index[repository] = {
+            "pull_requests": [
+                to_rest(pr)
+                for pr in sorted(
+                    nodes[f"open{i}"] + nodes[f"merged{i}"],
+                    key=lambda pr: pr["updatedAt"],
+                    reverse=True,
+                )
+            ],
+            "merged_count": merged_counts[i],
+        }
+
+    return index
+
+
+def request_pull_requests_list(project: Projects, report_date: datetime) -> List[dict]:
+    owner = projects_info[project]["owner"]
+    name = projects_info[project]["name"]
+
+    if GITHUB_BACKEND == "graphql":
+        return get_graphql_index(report_date)[(owner, name)]["pull_requests"]
+
+    return get_pull_requests_index(owner, name, report_date)
 
 
 def get_pull_requests_status(project: Projects, report_date: datetime):
@@ -118,16 +349,11 @@ def get_merged_prs(project: Projects, report_date: datetime):
         to_datetime=report_date.strftime("%Y-%m-%dT%H:%M"),
     )
 
-    # count prs
-    pull_requests = request_pull_requests_list(project, report_date)
-    count = len(
-        list(
-            filter(
-                (lambda pr: bool(pr.get("merged_at", None))),
-                pull_requests,
-            )
-        )
-    )
+    # count prs (totals of search aren't limited by amount of returned pull requests)
+    if GITHUB_BACKEND == "graphql":
+        count = get_graphql_index(report_date)[(owner, name)]["merged_count"]
+    else:
+        count = get_merged_counts(report_date)[(owner, name)]
 
     return {"link": url, "count": count}
 
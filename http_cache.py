@@ -0,0 +1,174 @@
+import os
+import json
+import threading
+from time import time
+from hashlib import sha1
+from dataclasses import dataclass
+from typing import Dict, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from common import Service
+import fixtures
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE", "1") == "1"
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "./.http_cache/")
+HTTP_CACHE_MAX_SIZE = int(os.getenv("HTTP_CACHE_MAX_SIZE", str(200 * 1024 * 1024)))
+
+# seconds during which cached response is used without revalidation
+# (services without ttl are not cached)
+HTTP_CACHE_TTL = {
+    Service.GITHUB: int(os.getenv("GITHUB_CACHE_TTL", "300")),
+    Service.JENKINS: int(os.getenv("JENKINS_CACHE_TTL", "300")),
+    Service.CONFLUENCE: int(os.getenv("CONFLUENCE_CACHE_TTL", "300")),
+}
+
+# headers which describe the transferred (not the decoded) body
+SKIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+_eviction_lock = threading.Lock()
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    headers: CaseInsensitiveDict
+    stored_at: float
+    body: bytes
+
+    def is_fresh(self, service: Service) -> bool:
+        return time() - self.stored_at < HTTP_CACHE_TTL[service]
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if "ETag" in self.headers:
+            headers["If-None-Match"] = self.headers["ETag"]
+        if "Last-Modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+    def to_response(self, request: requests.PreparedRequest) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = self.url
+        response.request = request
+        response._content = self.body
+        return response
+
+
+def is_enabled(service: Service) -> bool:
+    # recorded and replayed fixtures should contain only real responses
+    if fixtures.is_recording() or fixtures.is_replaying():
+        return False
+
+    return HTTP_CACHE_ENABLED and service in HTTP_CACHE_TTL
+
+
+def make_key(service: Service, request: requests.PreparedRequest) -> str:
+    # responses are different for different users, so credentials are part of the key
+    auth_scope = sha1(
+        request.headers.get("Authorization", "").encode("utf-8")
+    ).hexdigest()
+    return sha1(f"{service.name}\n{auth_scope}\n{request.url}".encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(HTTP_CACHE_PATH, key)
+
+
+def load(key: str) -> Optional[CacheEntry]:
+    path = _entry_path(key)
+
+    try:
+        with open(path, "rb") as file:
+            meta = json.loads(file.readline())
+            body = file.read()
+    except (OSError, ValueError):
+        return None
+
+    # mark entry as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+    return CacheEntry(
+        url=meta["url"],
+        status=meta["status"],
+        headers=CaseInsensitiveDict(meta["headers"]),
+        stored_at=meta["stored_at"],
+        body=body,
+    )
+
+
+def _write(key: str, entry: CacheEntry):
+    os.makedirs(HTTP_CACHE_PATH, exist_ok=True)
+
+    meta = {
+        "url": entry.url,
+        "status": entry.status,
+        "headers": dict(entry.headers),
+        "stored_at": entry.stored_at,
+    }
+
+    # write to temporary file first, so concurrent readers never see partial entry
+    path = _entry_path(key)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(json.dumps(meta).encode("utf-8") + b"\n")
+        file.write(entry.body)
+    os.replace(tmp_path, path)
+
+
+def store(key: str, response: requests.Response):
+    headers = CaseInsensitiveDict(
+        {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in SKIPPED_HEADERS
+        }
+    )
+
+    entry = CacheEntry(
+        url=response.url,
+        status=response.status_code,
+        headers=headers,
+        stored_at=time(),
+        body=response.content,
+    )
+    _write(key, entry)
+    _evict()
+
+
+def refresh(key: str, entry: CacheEntry, response: requests.Response) -> CacheEntry:
+    # 304 response can carry updated validators
+    for name in ("ETag", "Last-Modified"):
+        if name in response.headers:
+            entry.headers[name] = response.headers[name]
+
+    entry.stored_at = time()
+    _write(key, entry)
+    return entry
+
+
+def _evict():
+    # remove least recently used entries until cache fits into the size limit
+    with _eviction_lock:
+        entries = [
+            entry
+            for entry in os.scandir(HTTP_CACHE_PATH)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+        total_size = sum(entry.stat().st_size for entry in entries)
+
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if total_size <= HTTP_CACHE_MAX_SIZE:
+                break
+            total_size -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,189 @@
+import os
+import threading
+from typing import Dict, Optional
+from http import HTTPStatus
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+from common import Service
+import http_cache
+import fixtures
+import rate_limit
+import deadline
+
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# server side errors which are worth to retry
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# (connect, read) timeouts in seconds per service
+SERVICE_TIMEOUTS = {
+    Service.JIRA: (
+        float(os.getenv("JIRA_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("JIRA_READ_TIMEOUT", "60")),
+    ),
+    Service.GITHUB: (
+        float(os.getenv("GITHUB_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("GITHUB_READ_TIMEOUT", "30")),
+    ),
+    Service.JENKINS: (
+        float(os.getenv("JENKINS_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("JENKINS_READ_TIMEOUT", "30")),
+    ),
+    Service.CONFLUENCE: (
+        float(os.getenv("CONFLUENCE_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("CONFLUENCE_READ_TIMEOUT", "30")),
+    ),
+}
+
+
+class ServiceAdapter(HTTPAdapter):
+    def __init__(self, service: Service, limiter: rate_limit.RateLimiter, **kwargs):
+        self.service = service
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        # replayed responses don't touch network (and rate limits)
+        if fixtures.is_replaying():
+            return fixtures.replay_response(request)
+
+        # never wait for a stalled socket forever
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = SERVICE_TIMEOUTS[self.service]
+
+        attempt = 0
+        while True:
+            # requests of abandoned stage aren't sent anymore
+            deadline.check_cancelled()
+
+            self.limiter.acquire(self.limiter.resource(request))
+            try:
+                response = super().send(request, **kwargs)
+            finally:
+                self.limiter.release()
+
+            delay = self.limiter.update(response)
+            if (
+                delay is None
+                or attempt >= rate_limit.RATE_LIMIT_RETRIES
+                or delay > rate_limit.RATE_LIMIT_MAX_WAIT
+            ):
+                break
+
+            print(
+                f"WARNING: {self.service.name.capitalize()} throttled request, retry in {delay:.0f}s"
+            )
+            response.close()
+            deadline.sleep(delay)
+            attempt += 1
+
+        if fixtures.is_recording():
+            fixtures.record_response(request, response)
+
+        return response
+
+
+_sessions: Dict[Service, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _get_service_auth(service: Service) -> Optional[HTTPBasicAuth]:
+    if service == Service.JENKINS:
+        return HTTPBasicAuth(os.environ["JENKINS_USERNAME"], os.environ["JENKINS_TOKEN"])
+
+    # jira client configures authorization of its session itself
+    return None
+
+
+def _get_service_headers(service: Service) -> Dict[str, str]:
+    if service == Service.GITHUB:
+        return {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {os.environ['GITHUB_TOKEN']}",
+        }
+    elif service == Service.CONFLUENCE:
+        return {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {os.environ['CONFLUENCE_TOKEN']}",
+        }
+
+    return {}
+
+
+def _create_session(service: Service) -> requests.Session:
+    session = requests.Session()
+
+    session.auth = _get_service_auth(service)
+    session.headers.update(
+        {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+    )
+    session.headers.update(_get_service_headers(service))
+
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        # return the last response instead of raising, callers check status codes
+        raise_on_status=False,
+    )
+    adapter = ServiceAdapter(
+        service,
+        rate_limit.get_limiter(service, max_concurrency=HTTP_POOL_SIZE),
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_session(service: Service) -> requests.Session:
+    # one pooled session per service (each service lives on its own host)
+    with _sessions_lock:
+        if service not in _sessions:
+            _sessions[service] = _create_session(service)
+
+        return _sessions[service]
+
+
+def get(service: Service, url: str, **kwargs) -> requests.Response:
+    session = get_session(service)
+
+    if not http_cache.is_enabled(service):
+        return session.get(url, **kwargs)
+
+    # prepare request to know the final url and credentials for the cache key
+    request = session.prepare_request(
+        requests.Request("GET", url, params=kwargs.get("params"))
+    )
+    key = http_cache.make_key(service, request)
+
+    entry = http_cache.load(key)
+    if entry is not None and entry.is_fresh(service):
+        return entry.to_response(request)
+
+    # ask server whether cached response is still valid
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        headers.update(entry.conditional_headers())
+
+    response = session.get(url, headers=headers, **kwargs)
+
+    if response.status_code == HTTPStatus.NOT_MODIFIED and entry is not None:
+        entry = http_cache.refresh(key, entry, response)
+        return entry.to_response(response.request)
+
+    if response.status_code == HTTPStatus.OK:
+        http_cache.store(key, response)
+
+    return response
+
+
+def post(service: Service, url: str, **kwargs) -> requests.Response:
+    # responses with request body aren't kept in cache (key is built from url only)
+    return get_session(service).post(url, **kwargs)
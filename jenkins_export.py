@@ -1,19 +1,16 @@
 import os
+import re
 from datetime import datetime
-import requests
-from requests.auth import HTTPBasicAuth
-from bs4 import BeautifulSoup
-from typing import Dict
+from typing import Dict, Optional
 import json
 from urllib.parse import urljoin
-from lxml import etree
-from common import Projects
+from common import Projects, Service
 from http import HTTPStatus
+import http_client
+from memo import memoize
 
 
 JENKINS_HOST = os.getenv("JENKINS_HOST", "rpr.cis.luxoft.com")
-JENKINS_USERNAME = os.environ["JENKINS_USERNAME"]
-JENKINS_TOKEN = os.environ["JENKINS_TOKEN"]
 
 PROJECT_TO_JOB_MAPPING: Dict[Projects, Dict[str, str]] = {
     Projects.MAYA_RPR: {"default": "job/RPR-MayaPlugin-Weekly"},
@@ -29,11 +26,31 @@ PROJECT_TO_JOB_MAPPING: Dict[Projects, Dict[str, str]] = {
     Projects.RPRHYBRID: {},
 }
 
+# fields of the latest build used in report (html publisher links are in actions)
+BUILD_TREE = "lastBuild[number,url,timestamp,result,description,actions[_class,reportName,urlName]]"
 
+# parts of version in build description, e.g. <span id="version-major">2</span>
+VERSION_PATTERN = r"id=[\"']version-{part}[\"'][^>]*>\s*([^<]*?)\s*<"
+
+
+def validate_token() -> bool:
+    # bypass response cache, credentials should be checked by server
+    response = http_client.get_session(Service.JENKINS).get(
+        f"https://{JENKINS_HOST}/whoAmI/api/json?tree=authenticated"
+    )
+
+    if response.status_code == HTTPStatus.UNAUTHORIZED:
+        print("ERROR: Jenkins token in env var 'JENKINS_TOKEN' is invalid!")
+        return False
+
+    return True
+
+
+@memoize
 def _get_latest_build(project_path: str) -> dict:
-    response = requests.get(
-        f"https://{JENKINS_HOST}/{project_path}/api/json?tree=lastBuild[*]",
-        auth=HTTPBasicAuth(JENKINS_USERNAME, JENKINS_TOKEN),
+    response = http_client.get(
+        Service.JENKINS,
+        f"https://{JENKINS_HOST}/{project_path}/api/json?tree={BUILD_TREE}",
     )
 
     if response.status_code == HTTPStatus.UNAUTHORIZED:
@@ -49,11 +66,23 @@ def _get_latest_build_date(build_data: dict) -> str:
     ).strftime("%d-%b-%Y")
 
 
+def _find_report_action(build_data: dict) -> Optional[dict]:
+    # report link can have different ending, e.g. Test_20Report or Test_20Report_20Northstar
+    # however, it always contains 'Test_20Report'
+    for action in build_data["lastBuild"].get("actions", []):
+        if "Test_20Report" in (action or {}).get("urlName", ""):
+            return action
+
+    return None
+
+
 def _get_latest_report_link(build_data: dict) -> str:
-    response = requests.get(
-        build_data["lastBuild"]["url"],
-        auth=HTTPBasicAuth(JENKINS_USERNAME, JENKINS_TOKEN),
-    )
+    action = _find_report_action(build_data)
+    if action is not None:
+        return urljoin(build_data["lastBuild"]["url"], action["urlName"])
+
+    # older html publisher doesn't export its links, so they are found on build page
+    response = http_client.get(Service.JENKINS, build_data["lastBuild"]["url"])
 
     if response.status_code == HTTPStatus.UNAUTHORIZED:
         print("ERROR: Jenkins token in env var 'JENKINS_TOKEN' is invalid!")
@@ -61,6 +90,8 @@ def _get_latest_report_link(build_data: dict) -> str:
 
     latest_build_page = response.text
 
+    from bs4 import BeautifulSoup
+
     # report link can have different ending, e.g. Test_20Report or Test_20Report_20Northstar
     # however, it always contains 'Test_20Report'
     html_parser = BeautifulSoup(latest_build_page, "html.parser")
@@ -72,15 +103,15 @@ def _get_latest_report_link(build_data: dict) -> str:
 
 
 def _get_latest_build_version(project_config: str, build_data: dict) -> str:
-    description = build_data["lastBuild"]["description"]
+    description = build_data["lastBuild"]["description"] or ""
 
-    dom = etree.HTML(description)
+    parts = [
+        re.search(VERSION_PATTERN.format(part=part), description)
+        for part in ("major", "minor", "patch")
+    ]
 
-    if dom.xpath("//*[@id='version-major']"):
-        major = dom.xpath("//*[@id='version-major']")[0].text.strip()
-        minor = dom.xpath("//*[@id='version-minor']")[0].text.strip()
-        patch = dom.xpath("//*[@id='version-patch']")[0].text.strip()
-        return f"{major}.{minor}.{patch}"
+    if all(parts):
+        return ".".join(part.group(1) for part in parts)
     else:
         return project_config
 
@@ -1,25 +1,51 @@
 import os
-from datetime import datetime, timedelta, date
-from atlassian import Jira
-from common import Projects, IssueType
+import sys
+import threading
+from datetime import datetime, timedelta
+from requests import HTTPError
+from common import Projects, IssueType, Service
+import http_client
+import deadline
+from memo import memoize
 import json
 import urllib
-from typing import List
+import ijson
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from atlassian import Jira
 
 JIRA_URL = os.getenv("JIRA_URL", "https://amdrender.atlassian.net/")
-JIRA_USERNAME = os.environ["JIRA_USERNAME"]
-JIRA_TOKEN = os.environ["JIRA_TOKEN"]
 
+_jira_instance: Optional["Jira"] = None
+_jira_lock = threading.Lock()
+
+
+def get_jira() -> "Jira":
+    # client (and heavy atlassian package) is loaded on first use
+    global _jira_instance
 
-jira_instance = Jira(
-    # Url of jira server
-    url=JIRA_URL,
-    # loginuser name
-    username=JIRA_USERNAME,
-    # password/token
-    password=JIRA_TOKEN,
-    cloud=True,
-)
+    with _jira_lock:
+        if _jira_instance is None:
+            from atlassian import Jira
+
+            _jira_instance = Jira(
+                # Url of jira server
+                url=JIRA_URL,
+                # loginuser name
+                username=os.environ["JIRA_USERNAME"],
+                # password/token
+                password=os.environ["JIRA_TOKEN"],
+                cloud=True,
+                # shared pooled session
+                session=http_client.get_session(Service.JIRA),
+            )
+            # client casts timeout argument to int, so (connect, read) pair is set directly
+            _jira_instance.timeout = http_client.SERVICE_TIMEOUTS[Service.JIRA]
+
+        return _jira_instance
 
 projects_jira_names = {
     Projects.MAYA_RPR: "RPRMAYA",
@@ -67,15 +93,58 @@ projects_jira_open_statuses = {
     Projects.INVENTOR: '"In Progress", "In Testing", Open, Reopened',
 }
 
-def validate_token():
-    issues = jira_instance.jql("")
-    if issues['total'] == 0:
+# maximum page size of jira search
+JIRA_PAGE_SIZE = 100
+# amount of concurrently requested pages of one search
+JIRA_PAGE_WORKERS = int(os.getenv("JIRA_PAGE_WORKERS", "4"))
+# size of chunks in which search responses are read and parsed
+JIRA_PARSE_CHUNK_SIZE = 64 * 1024
+# fields requested by each jira query (consumers can read only these fields)
+JIRA_FIELDS = {
+    "open_issues": ["project", "priority", "summary"],
+    "new_bugs": ["project"],
+    # only total is used, but at least one field should be requested
+    "count": ["key"],
+    "issues_history": [
+        "project",
+        "priority",
+        "created",
+        "status",
+        "statuscategorychangedate",
+    ],
+    "charts": ["project", "status", "resolution", "updated"],
+    "mirror_keys": ["key"],
+    "mirror": [
+        "project",
+        "priority",
+        "status",
+        "summary",
+        "created",
+        "updated",
+        "statuscategorychangedate",
+    ],
+}
+
+# count new bugs of all projects with one search instead of a count query per project
+JIRA_BATCHED_COUNTS = os.getenv("JIRA_BATCHED_COUNTS", "0") == "1"
+# answer report queries from local issues mirror (only changed issues are requested)
+JIRA_MIRROR = os.getenv("JIRA_MIRROR", "0") == "1"
+
+jira_priorities = {
+    "Blocker": IssueType.BLOCKER,
+    "Critical": IssueType.CRITICAL,
+}
+
+def validate_token() -> bool:
+    # the cheapest request which requires authorization
+    try:
+        get_jira().get("rest/api/2/myself")
+    except HTTPError:
         print("ERROR: Jira token 'JIRA_TOKEN' is invalid!")
-        exit(-1)
+        return False
 
+    return True
 
-# validate token on module's load
-validate_token()
 
 def get_blockers_link(project: Projects, report_date: datetime) -> str:
     name = projects_jira_names[project]
@@ -105,45 +174,207 @@ def get_crits_link(project: Projects, report_date: datetime) -> str:
     )
 
 
-def get_project_blockers(project: Projects, report_date: datetime) -> List[dict]:
+def _jira_datetime(value: Optional[str]) -> Optional[str]:
+    # "2023-01-31T12:34:56.000+0100" -> "2023-01-31 12:34" (the same format as in jql)
+    if value is None:
+        return None
 
-    jql_request = "project = {name} AND issuetype in (Bug, Sub-task) AND status in ({statuses}) AND priority = Blocker AND created < '{to_datetime}' ORDER BY created DESC".format(
-        name=projects_jira_names[project],
-        statuses=projects_jira_open_statuses[project],
-        to_datetime=(report_date).strftime("%Y-%m-%d %H:%M"),
+    return value[:16].replace("T", " ")
+
+
+# record attribute: (jira field, conversion of its value)
+ISSUE_RECORD_FIELDS = {
+    "project": ("project", lambda value: sys.intern(value["key"])),
+    "priority": ("priority", lambda value: sys.intern(value["name"]) if value else None),
+    "status": ("status", lambda value: sys.intern(value["name"])),
+    "resolution": ("resolution", lambda value: sys.intern(value["name"]) if value else None),
+    "created": ("created", _jira_datetime),
+    "updated": ("updated", _jira_datetime),
+    "resolved": ("statuscategorychangedate", _jira_datetime),
+    "summary": ("summary", lambda value: value),
+}
+
+
+class JiraIssue:
+    # compact issue record, only attributes of requested fields are set,
+    # access to not requested field is a bug (jira silently omits fields which weren't requested)
+    __slots__ = ("key", "query") + tuple(ISSUE_RECORD_FIELDS)
+
+    def __init__(self, key: str, query: str, **attributes):
+        self.key = key
+        self.query = query
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+    def __getattr__(self, name: str):
+        # called only for attributes which aren't set
+        if name not in ISSUE_RECORD_FIELDS:
+            raise AttributeError(name)
+        raise AttributeError(
+            f"Field of '{name}' isn't declared for '{self.query}' jira query in JIRA_FIELDS"
+        )
+
+    @classmethod
+    def from_json(cls, issue: dict, query: str) -> "JiraIssue":
+        fields = issue["fields"]
+        return cls(
+            issue["key"],
+            query,
+            **{
+                name: convert(fields.get(field))
+                for name, (field, convert) in ISSUE_RECORD_FIELDS.items()
+                if field in JIRA_FIELDS[query]
+            },
+        )
+
+
+def _parse_search_page(stream: IO[bytes], query: str) -> Tuple[int, List[JiraIssue]]:
+    # body is read by chunks and parsed issues are turned into records right away,
+    # so json of the whole page is never kept in memory
+    totals = ijson.sendable_list()
+    parsed_issues = ijson.sendable_list()
+    # jira returns total before issues, so its parser is dropped after it's found
+    total_parser = ijson.items_coro(totals, "total")
+    issues_parser = ijson.items_coro(parsed_issues, "issues.item")
+
+    issues: List[JiraIssue] = []
+    for chunk in iter(lambda: stream.read(JIRA_PARSE_CHUNK_SIZE), b""):
+        deadline.check_cancelled()
+
+        if not totals:
+            total_parser.send(chunk)
+        issues_parser.send(chunk)
+
+        issues.extend(JiraIssue.from_json(issue, query) for issue in parsed_issues)
+        parsed_issues.clear()
+
+    if not totals:
+        total_parser.close()
+    issues_parser.close()
+    issues.extend(JiraIssue.from_json(issue, query) for issue in parsed_issues)
+
+    return int(totals[0]) if totals else 0, issues
+
+
+def _jql_page(jql_request: str, query: str, start: int) -> Tuple[int, List[JiraIssue]]:
+    # jira client configures authorization of the shared session
+    jira = get_jira()
+
+    response = http_client.get_session(Service.JIRA).get(
+        JIRA_URL.rstrip("/") + "/" + jira.resource_url("search"),
+        params={
+            "jql": jql_request,
+            "fields": ",".join(JIRA_FIELDS[query]),
+            "startAt": start,
+            "maxResults": JIRA_PAGE_SIZE,
+        },
+        stream=True,
     )
-    issues = jira_instance.jql(jql_request).get("issues")
-
-    blockers = []
-    for issue in issues:
-        blocker = {
-            "key": issue["key"],
-            "link": JIRA_URL + "/browse/" + issue["key"],
-            "description": issue["fields"]["summary"],
-        }
-        blockers.append(blocker)
+    with response:
+        response.raise_for_status()
+        # read decompressed body
+        response.raw.decode_content = True
+        return _parse_search_page(response.raw, query)
 
-    return blockers
 
+def _jql_all(jql_request: str, query: str) -> Iterator[JiraIssue]:
+    # stream issues of all pages of search results (with fields of the query only)
 
-def get_project_crits(project: Projects, report_date: datetime):
-    jql_request = "project = {name} AND issuetype in (Bug, Sub-task) AND status in ({statuses}) AND priority = Critical AND created < '{to_datetime}' ORDER BY created DESC".format(
-        name=projects_jira_names[project],
-        statuses=projects_jira_open_statuses[project],
+    # total is known from the first page, the rest pages are requested at once
+    total, first_issues = _jql_page(jql_request, query, 0)
+
+    # jira can return less issues per page than requested (maxResults is capped by server),
+    # so the rest pages are as large as the first one
+    starts = range(len(first_issues), total, len(first_issues) or 1)
+    if not first_issues or not starts:
+        yield from first_issues
+        return
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(JIRA_PAGE_WORKERS, len(starts)), thread_name_prefix="jira-pages"
+    )
+    try:
+        pages = [
+            deadline.submit(executor, _jql_page, jql_request, query, start) for start in starts
+        ]
+
+        # issues are yielded in the search order as soon as their page is ready
+        yield from first_issues
+        for page in pages:
+            _, issues = page.result()
+            yield from issues
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _jql_count(jql_request: str) -> int:
+    # only total is needed, so no issues are requested
+    fields = ",".join(JIRA_FIELDS["count"])
+    return int(get_jira().jql(jql_request, fields=fields, limit=0)["total"])
+
+
+def _parse_statuses(statuses: str) -> frozenset:
+    # jql status names are case insensitive
+    return frozenset(
+        status.strip().strip('"').lower() for status in statuses.split(",")
+    )
+
+
+def get_open_issues_jql(report_date: datetime) -> str:
+    # projects with the same open statuses share one condition
+    statuses_projects: Dict[frozenset, List[Projects]] = {}
+    for project in projects_jira_names:
+        statuses = _parse_statuses(projects_jira_open_statuses[project])
+        statuses_projects.setdefault(statuses, []).append(project)
+
+    conditions = [
+        "(project in ({names}) AND status in ({statuses}))".format(
+            names=", ".join(projects_jira_names[project] for project in projects),
+            statuses=projects_jira_open_statuses[projects[0]],
+        )
+        for projects in statuses_projects.values()
+    ]
+
+    return "issuetype in (Bug, Sub-task) AND priority in ({priorities}) AND created < '{to_datetime}' AND ({conditions}) ORDER BY created DESC".format(
+        priorities=", ".join(jira_priorities),
         to_datetime=(report_date).strftime("%Y-%m-%d %H:%M"),
+        conditions=" OR ".join(conditions),
     )
-    issues = jira_instance.jql(jql_request).get("issues")
-
-    crits = []
-    for issue in issues:
-        crit = {
-            "key": issue["key"],
-            "link": JIRA_URL + "/browse/" + issue["key"],
-            "description": issue["fields"]["summary"],
-        }
-        crits.append(crit)
 
-    return crits
+
+@memoize
+def get_open_issues(report_date: datetime) -> Dict[Projects, Dict[IssueType, List[dict]]]:
+    if JIRA_MIRROR:
+        import jira_mirror
+
+        return jira_mirror.get_open_issues(report_date)
+
+    # open blockers and crits of all projects are requested at once and split locally
+    projects_by_name = {name: project for project, name in projects_jira_names.items()}
+
+    open_issues: Dict[Projects, Dict[IssueType, List[dict]]] = {
+        project: {issue_type: [] for issue_type in IssueType}
+        for project in projects_jira_names
+    }
+
+    for issue in _jql_all(get_open_issues_jql(report_date), "open_issues"):
+        open_issues[projects_by_name[issue.project]][jira_priorities[issue.priority]].append(
+            {
+                "key": issue.key,
+                "link": JIRA_URL + "/browse/" + issue.key,
+                "description": issue.summary,
+            }
+        )
+
+    return open_issues
+
+
+def get_project_blockers(project: Projects, report_date: datetime) -> List[dict]:
+    return get_open_issues(report_date)[project][IssueType.BLOCKER]
+
+
+def get_project_crits(project: Projects, report_date: datetime) -> List[dict]:
+    return get_open_issues(report_date)[project][IssueType.CRITICAL]
 
 
 def get_blockers(report_date: datetime):
@@ -162,96 +393,268 @@ def get_crits(report_date: datetime):
     return crits
 
 
-def get_bugs(report_date: datetime):
-    new_bugs = {}
+def get_new_bugs_jql(projects: str, report_date: datetime) -> str:
+    return "created >= {from_date} AND created < '{to_datetime}' AND project in ({projects}) AND issuetype in (Bug, Sub-task)".format(
+        from_date=(report_date - timedelta(weeks=2) + timedelta(days=1)).strftime(
+            "%Y-%m-%d"
+        ),
+        to_datetime=(report_date).strftime("%Y-%m-%d %H:%M"),
+        projects=projects,
+    )
 
-    for project in projects_jira_names:
-        project_jira_name = projects_jira_names[project]
-
-        jql_request = "created >= {from_date} AND created < '{to_datetime}' AND project = {project} AND issuetype in (Bug, Sub-task) ORDER BY created DESC".format(
-            from_date=(report_date - timedelta(weeks=2) + timedelta(days=1)).strftime(
-                "%Y-%m-%d"
-            ),
-            to_datetime=(report_date).strftime("%Y-%m-%d %H:%M"),
-            project=project_jira_name,
-        )
-        issues = jira_instance.jql(jql_request)
-        count = issues["total"]
-
-        link = (
-            JIRA_URL
-            + "/issues/?jql="
-            + urllib.parse.quote(
-                "project = {project} AND issuetype in (Bug, Sub-task) AND created >= {from_date} AND created < '{to_datetime}' ORDER BY created DESC".format(
-                    from_date=(
-                        report_date - timedelta(weeks=2) + timedelta(days=1)
-                    ).strftime("%Y-%m-%d"),
-                    to_datetime=(report_date).strftime(
-                        "%Y-%m-%d %H:%M"
-                    ),
-                    project=project_jira_name,
-                )
+
+@memoize
+def get_new_bugs_counts(report_date: datetime) -> Dict[Projects, int]:
+    if JIRA_MIRROR:
+        import jira_mirror
+
+        return jira_mirror.get_new_bugs_counts(report_date)
+
+    # one search for all projects (only project field), counted locally
+    projects_by_name = {name: project for project, name in projects_jira_names.items()}
+    counts = {project: 0 for project in projects_jira_names}
+
+    jql_request = get_new_bugs_jql(", ".join(projects_jira_names.values()), report_date)
+    for issue in _jql_all(jql_request, "new_bugs"):
+        counts[projects_by_name[issue.project]] += 1
+
+    return counts
+
+
+@memoize
+def get_project_bugs(project: Projects, report_date: datetime) -> dict:
+    project_jira_name = projects_jira_names[project]
+
+    if JIRA_MIRROR or JIRA_BATCHED_COUNTS:
+        count = get_new_bugs_counts(report_date)[project]
+    else:
+        count = _jql_count(get_new_bugs_jql(project_jira_name, report_date))
+
+    link = (
+        JIRA_URL
+        + "/issues/?jql="
+        + urllib.parse.quote(
+            "project = {project} AND issuetype in (Bug, Sub-task) AND created >= {from_date} AND created < '{to_datetime}' ORDER BY created DESC".format(
+                from_date=(
+                    report_date - timedelta(weeks=2) + timedelta(days=1)
+                ).strftime("%Y-%m-%d"),
+                to_datetime=(report_date).strftime(
+                    "%Y-%m-%d %H:%M"
+                ),
+                project=project_jira_name,
             )
         )
+    )
+
+    return {"count": int(count), "link": link}
+
+
+def get_bugs(report_date: datetime):
+    new_bugs = {}
 
-        new_bugs[project] = {"count": int(count), "link": link}
+    for project in projects_jira_names:
+        new_bugs[project] = get_project_bugs(project, report_date)
 
     return new_bugs
 
 
-def get_issues_statistic(project: Projects, report_date: datetime, type: IssueType):
-    # request issues list
-    name = projects_jira_names[project]
-    jql_request = f'project = {name} AND issuetype in (Bug, Sub-task) AND priority = {"Blocker" if type == IssueType.BLOCKER else "Critical"} AND (updated >= -26w OR status IN ({str(jira_open_statuses_list).replace("[","").replace("]","")})) ORDER BY created ASC'
-    issues = jira_instance.jql(
-        jql_request, fields="statuscategorychangedate, created, status"
-    ).get("issues")
+@memoize
+def get_recorded_issue_counts(
+    projects: Tuple[Projects, ...], report_date: datetime
+) -> Dict[Projects, Dict[IssueType, List[Optional[int]]]]:
+    # plot points of past buckets recorded by previous reports (None if bucket isn't recorded)
+    import fixtures
+    import snapshots
+    from open_issues import get_buckets
 
-    # format issues list
-    issues = [
-        {
-            "from": datetime.strptime(
-                issue["fields"]["created"].split("T")[0], "%Y-%m-%d"
-            ).date(),
-            "to": date.today()
-            if issue["fields"]["status"]["name"] in jira_open_statuses_list
-            else datetime.strptime(
-                issue["fields"]["statuscategorychangedate"].split("T")[0], "%Y-%m-%d"
-            ).date(),
+    buckets = get_buckets(report_date.date())
+
+    # recorded and replayed fixtures shouldn't depend on local history
+    if fixtures.is_recording() or fixtures.is_replaying():
+        recorded = {}
+    else:
+        recorded = snapshots.load_snapshots()
+
+    return {
+        project: {
+            issue_type: snapshots.get_recorded_counts(recorded, project, issue_type, buckets)
+            for issue_type in IssueType
         }
-        for issue in issues
+        for project in projects
+    }
+
+
+@memoize
+def get_issues_history(
+    projects: Tuple[Projects, ...], report_date: datetime
+) -> Dict[Projects, Dict[IssueType, List[JiraIssue]]]:
+    from open_issues import get_buckets
+
+    if JIRA_MIRROR:
+        import jira_mirror
+
+        return jira_mirror.get_issues_history(projects, report_date)
+
+    # blockers and crits of all plotted projects are requested at once
+    # {project: {issue type: [issue]}} (with created, status and resolved dates)
+    projects_by_name = {name: project for project, name in projects_jira_names.items()}
+
+    # issues resolved before the first not recorded bucket don't affect the plot
+    # (recorded buckets are taken from snapshots)
+    recorded = get_recorded_issue_counts(projects, report_date)
+    first_bucket = min(
+        counts.index(None)
+        for project_counts in recorded.values()
+        for counts in project_counts.values()
+    )
+    plot_start = get_buckets(report_date.date())[first_bucket][0]
+
+    jql_request = "project in ({names}) AND issuetype in (Bug, Sub-task) AND priority in ({priorities}) AND (updated >= '{plot_start}' OR status IN ({statuses})) ORDER BY created ASC".format(
+        names=", ".join(projects_jira_names[project] for project in projects),
+        priorities=", ".join(jira_priorities),
+        plot_start=plot_start.strftime("%Y-%m-%d"),
+        statuses=str(jira_open_statuses_list).replace("[", "").replace("]", ""),
+    )
+
+    history: Dict[Projects, Dict[IssueType, List[JiraIssue]]] = {
+        project: {issue_type: [] for issue_type in IssueType} for project in projects
+    }
+
+    for issue in _jql_all(jql_request, "issues_history"):
+        history[projects_by_name[issue.project]][jira_priorities[issue.priority]].append(
+            issue
+        )
+
+    return history
+
+
+def get_issues_statistic(
+    project: Projects,
+    report_date: datetime,
+    type: IssueType,
+    projects: Tuple[Projects, ...] = (),
+):
+    from open_issues import get_buckets, count_open_issues, to_days
+
+    # statistic of all projects is calculated from one shared history
+    issues = get_issues_history(projects or (project,), report_date)[project][type]
+
+    # (bucket size and plot length are configured by ISSUES_PLOT_* variables)
+    buckets = get_buckets(report_date.date())
+    # open issues are counted up to the report date (not the run date)
+    report_day = report_date.strftime("%Y-%m-%d")
+    issues_per_interval = count_open_issues(
+        to_days([issue.created[:10] for issue in issues]),
+        to_days(
+            [
+                report_day
+                if issue.status in jira_open_statuses_list
+                else (issue.resolved or issue.created)[:10]
+                for issue in issues
+            ]
+        ),
+        buckets,
+    )
+
+    # history of recorded buckets isn't requested, so their points are taken from snapshots
+    recorded = get_recorded_issue_counts(projects or (project,), report_date)[project][type]
+    issues_per_interval = [
+        count if recorded_count is None else recorded_count
+        for count, recorded_count in zip(issues_per_interval, recorded)
     ]
 
-    # prepare periods array
-    period_end = report_date
-    period_start = report_date - timedelta(weeks=1)
-    intervals = []
-    # 26 weeks = year
-    while period_start >= (report_date - timedelta(weeks=26)):
-        intervals.append({"from": period_start.date(), "to": period_end.date()})
-        period_end = period_start
-        period_start -= timedelta(weeks=1)
-
-    intervals = intervals[::-1]  # reverse list
-
-    # calculate
-    issues_per_interval = [0 for _ in intervals]
-
-    i = 0
-    j = 0
-    for issue in issues:
-        while i < len(intervals) and issue["from"] > intervals[i]["to"]:
-            i += 1
-        j = i
-        while j < len(intervals) and issue["to"] > intervals[j]["from"]:
-            issues_per_interval[j] += 1
-            j += 1
-
-    intervals = [interval["to"] for interval in intervals]
+    intervals = [end for _, end in buckets]
     return (intervals, issues_per_interval)
 
 
+def _peak_memory() -> int:
+    # peak RSS of the process in bytes (peak of python allocations on windows)
+    if sys.platform == "win32":
+        import tracemalloc
+
+        return tracemalloc.get_traced_memory()[1]
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _memory_benchmark_run(mode: str, path: str):
+    # parse search results in a fresh process, so peaks of modes don't mix
+    if sys.platform == "win32":
+        import tracemalloc
+
+        tracemalloc.start()
+
+    baseline = _peak_memory()
+    start = perf_counter()
+
+    with open(path, "rb") as file:
+        if mode == "json":
+            # previous implementation: the whole page is loaded and issues are kept as dicts
+            issues = json.load(file)["issues"]
+        else:
+            _, issues = _parse_search_page(file, "mirror")
+
+    print(
+        f"{mode}: {len(issues)} issues in {perf_counter() - start:.2f}s, peak memory {_peak_memory() / 2**20:.1f}MB ({baseline / 2**20:.1f}MB before parsing)"
+    )
+
+
+def _memory_benchmark(amount: int = 50000):
+    # peak memory of parsing synthetic search results (no jira access required)
+    import random
+    import subprocess
+    import tempfile
+
+    statuses = ["Open", "In Progress", "Resolved", "Closed"]
+    # issues are written one by one (peak RSS of this process is inherited by children)
+    issues = (
+        {
+            "expand": "operations,versionedRepresentations,editmeta,changelog,renderedFields",
+            "id": str(10000 + i),
+            "self": f"{JIRA_URL}rest/api/2/issue/{10000 + i}",
+            "key": f"RPR-{i}",
+            "fields": {
+                "project": {"key": "RPR", "name": "Radeon ProRender", "id": "10000"},
+                "priority": {"name": random.choice(list(jira_priorities)), "id": "2"},
+                "status": {"name": random.choice(statuses), "id": "1"},
+                "summary": f"Issue {i} summary " + "x" * random.randint(20, 80),
+                "created": "2023-01-31T12:34:56.000+0100",
+                "updated": "2023-02-28T12:34:56.000+0100",
+                "statuscategorychangedate": "2023-02-28T12:34:56.000+0100",
+            },
+        }
+        for i in range(amount)
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.json")
+        with open(path, "w") as file:
+            file.write(f'{{"startAt": 0, "maxResults": {amount}, "total": {amount}, "issues": [')
+            for i, issue in enumerate(issues):
+                file.write((", " if i else "") + json.dumps(issue))
+            file.write("]}")
+
+        for mode in ("json", "stream"):
+            subprocess.run(
+                [sys.executable, __file__, "--memory-benchmark-run", mode, path], check=True
+            )
+
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["--memory-benchmark"]:
+        _memory_benchmark()
+        exit(0)
+    elif sys.argv[1:2] == ["--memory-benchmark-run"]:
+        _memory_benchmark_run(sys.argv[2], sys.argv[3])
+        exit(0)
+
+    if not validate_token():
+        exit(-1)
+
     today = datetime.today()
 
     print("Bugs: ")
@@ -0,0 +1,252 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from common import Projects, IssueType
+from memo import memoize
+import fixtures
+from jira_export import (
+    JIRA_URL,
+    projects_jira_names,
+    projects_jira_open_statuses,
+    jira_open_statuses_list,
+    jira_priorities,
+    JiraIssue,
+    _jql_all,
+    _parse_statuses,
+)
+
+JIRA_MIRROR_PATH = os.getenv("JIRA_MIRROR_PATH", "./jira_mirror.sqlite")
+# issues updated a bit before the last sync are requested again
+# (jql dates are in timezone of jira user, not in the local one)
+JIRA_MIRROR_OVERLAP = timedelta(hours=float(os.getenv("JIRA_MIRROR_OVERLAP", "24")))
+# how often keys of mirrored issues are compared with jira
+# (deleted, moved or no longer matching issues aren't returned by updated issues sync)
+JIRA_MIRROR_RECONCILE_PERIOD = timedelta(
+    days=float(os.getenv("JIRA_MIRROR_RECONCILE_DAYS", "7"))
+)
+
+# jira dates are stored as "YYYY-MM-DD HH:MM" (the same format as in jql)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    key TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    priority TEXT,
+    status TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    status_changed TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_project_priority_status_created
+    ON issues (project, priority, status, created);
+CREATE TABLE IF NOT EXISTS sync (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_sync TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reconcile (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_reconcile TEXT NOT NULL
+);
+"""
+
+_connection: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def _is_persistent() -> bool:
+    # recorded and replayed fixtures should contain all requests of the sync
+    return not (fixtures.is_recording() or fixtures.is_replaying())
+
+
+def _get_connection() -> sqlite3.Connection:
+    # one connection shared by all threads (access is serialized by lock)
+    global _connection
+
+    if _connection is None:
+        _connection = sqlite3.connect(
+            JIRA_MIRROR_PATH if _is_persistent() else ":memory:", check_same_thread=False
+        )
+        _connection.executescript(SCHEMA)
+
+    return _connection
+
+
+@memoize
+def sync(report_date: datetime):
+    # request only issues updated since the last sync
+    from open_issues import get_buckets
+
+    with _lock:
+        row = _get_connection().execute("SELECT last_sync FROM sync").fetchone()
+
+    sync_started_at = datetime.now()
+
+    jql_request = "project in ({names}) AND issuetype in (Bug, Sub-task)".format(
+        names=", ".join(projects_jira_names.values())
+    )
+    # issues which can appear in the report
+    scope_jql_request = jql_request + (
+        " AND (updated >= '{plot_start}' OR status IN ({statuses}))"
+    ).format(
+        plot_start=get_buckets(report_date.date())[0][0].strftime("%Y-%m-%d"),
+        statuses=str(jira_open_statuses_list).replace("[", "").replace("]", ""),
+    )
+    if row is not None:
+        jql_request += " AND updated >= '{last_sync}'".format(last_sync=row[0])
+    else:
+        # the first sync is limited to the issues in scope
+        jql_request = scope_jql_request
+
+    rows = [
+        (
+            issue.key,
+            issue.project,
+            issue.priority,
+            issue.status,
+            issue.summary,
+            issue.created,
+            issue.updated,
+            issue.resolved,
+        )
+        for issue in _jql_all(jql_request, "mirror")
+    ]
+
+    last_sync = (sync_started_at - JIRA_MIRROR_OVERLAP).strftime("%Y-%m-%d %H:%M")
+
+    with _lock:
+        connection = _get_connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO sync (id, last_sync) VALUES (1, ?)", (last_sync,)
+            )
+
+    print(f"Jira mirror synced: {len(rows)} updated issues")
+
+    if row is not None:
+        _reconcile(scope_jql_request, sync_started_at)
+
+
+def _reconcile(scope_jql_request: str, sync_started_at: datetime):
+    # rows which aren't in scope anymore are dropped
+    with _lock:
+        row = _get_connection().execute("SELECT last_reconcile FROM reconcile").fetchone()
+
+    if (
+        row is not None
+        and sync_started_at - datetime.fromisoformat(row[0]) < JIRA_MIRROR_RECONCILE_PERIOD
+    ):
+        return
+
+    keys = [(issue.key,) for issue in _jql_all(scope_jql_request, "mirror_keys")]
+
+    with _lock:
+        connection = _get_connection()
+        with connection:
+            connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS scope_keys (key TEXT PRIMARY KEY)"
+            )
+            connection.execute("DELETE FROM scope_keys")
+            connection.executemany("INSERT OR IGNORE INTO scope_keys VALUES (?)", keys)
+            removed = connection.execute(
+                "DELETE FROM issues WHERE key NOT IN (SELECT key FROM scope_keys)"
+            ).rowcount
+            connection.execute(
+                "INSERT OR REPLACE INTO reconcile (id, last_reconcile) VALUES (1, ?)",
+                (sync_started_at.isoformat(),),
+            )
+
+    print(f"Jira mirror reconciled: {removed} issues out of scope removed")
+
+
+def _query(sql: str, parameters: Tuple) -> List[tuple]:
+    with _lock:
+        return _get_connection().execute(sql, parameters).fetchall()
+
+
+def get_open_issues(report_date: datetime) -> Dict[Projects, Dict[IssueType, List[dict]]]:
+    sync(report_date)
+
+    open_issues: Dict[Projects, Dict[IssueType, List[dict]]] = {}
+    for project, name in projects_jira_names.items():
+        statuses = sorted(_parse_statuses(projects_jira_open_statuses[project]))
+
+        open_issues[project] = {issue_type: [] for issue_type in IssueType}
+        for key, priority, summary in _query(
+            "SELECT key, priority, summary FROM issues WHERE project = ? AND priority IN ({priorities}) AND lower(status) IN ({statuses}) AND created < ? ORDER BY created DESC".format(
+                priorities=", ".join("?" for _ in jira_priorities),
+                statuses=", ".join("?" for _ in statuses),
+            ),
+            (
+                name,
+                *jira_priorities,
+                *statuses,
+                report_date.strftime("%Y-%m-%d %H:%M"),
+            ),
+        ):
+            open_issues[project][jira_priorities[priority]].append(
+                {
+                    "key": key,
+                    "link": JIRA_URL + "/browse/" + key,
+                    "description": summary,
+                }
+            )
+
+    return open_issues
+
+
+def get_new_bugs_counts(report_date: datetime) -> Dict[Projects, int]:
+    sync(report_date)
+
+    counts = dict(
+        _query(
+            "SELECT project, count(*) FROM issues WHERE created >= ? AND created < ? GROUP BY project",
+            (
+                (report_date - timedelta(weeks=2) + timedelta(days=1)).strftime("%Y-%m-%d"),
+                report_date.strftime("%Y-%m-%d %H:%M"),
+            ),
+        )
+    )
+
+    return {project: counts.get(name, 0) for project, name in projects_jira_names.items()}
+
+
+def get_issues_history(
+    projects: Tuple[Projects, ...], report_date: datetime
+) -> Dict[Projects, Dict[IssueType, List[JiraIssue]]]:
+    from open_issues import get_buckets
+
+    sync(report_date)
+
+    projects_by_name = {projects_jira_names[project]: project for project in projects}
+    plot_start = get_buckets(report_date.date())[0][0].strftime("%Y-%m-%d")
+
+    history: Dict[Projects, Dict[IssueType, List[JiraIssue]]] = {
+        project: {issue_type: [] for issue_type in IssueType} for project in projects
+    }
+
+    for key, name, priority, status, created, status_changed in _query(
+        "SELECT key, project, priority, status, created, status_changed FROM issues WHERE project IN ({names}) AND priority IN ({priorities}) AND (updated >= ? OR status IN ({statuses})) ORDER BY created ASC".format(
+            names=", ".join("?" for _ in projects_by_name),
+            priorities=", ".join("?" for _ in jira_priorities),
+            statuses=", ".join("?" for _ in jira_open_statuses_list),
+        ),
+        (*projects_by_name, *jira_priorities, plot_start, *jira_open_statuses_list),
+    ):
+        history[projects_by_name[name]][jira_priorities[priority]].append(
+            JiraIssue(
+                key,
+                "issues_history",
+                project=name,
+                priority=priority,
+                status=status,
+                created=created,
+                resolved=status_changed,
+            )
+        )
+
+    return history
@@ -1,10 +1,10 @@
 import os
+import zipfile
 from lxml import etree
-from typing import List, Dict, Tuple
+from typing import List, Dict, Set, Tuple
 import shutil
 from datetime import datetime, timedelta
-from PIL import Image
-import plotly.graph_objects as go
+from dataclasses import dataclass, field
 
 import ids
 from common import (
@@ -18,23 +18,25 @@ from common import (
     WORKING_DIR_PATH,
     PICTURES_PATH,
 )
-from confluence_export import get_tasks, get_main_tasks
-from jira_export import (
-    get_blockers,
-    get_bugs,
-    get_crits,
-    get_blockers_link,
-    get_crits_link,
-    get_issues_statistic,
-)
-from github_export import get_pull_requests_status, get_merged_prs
-from jenkins_export import get_latest_build_data, get_wml_report_link
-from charts_export import export_charts
-from wml_chart_export import export_wml_chart
+from confluence_export import get_main_tasks
+from jira_export import get_blockers_link, get_crits_link
+from prefetch import ReportData, prefetch_report_data
+from credentials import validate_credentials
 import word
+import memo
+import fixtures
+import snapshots
+from deadline import Deadline
+from checkpoint import Checkpoint, digest, template_digest
 
 REPORT_FILE_PATH = "./weekly_qa_report-{date}.docx"
 
+# overall time budget of the report in seconds
+REPORT_DEADLINE = float(os.getenv("REPORT_DEADLINE", "1800"))
+# share of the deadline given to each stage
+STAGE_SHARES = {"fetch": 0.4, "charts": 0.3, "wml chart": 0.2}
+DEFAULT_STAGE_SHARE = 0.01
+
 
 def append_bullet_list_element_after(
     element: etree.Element, content: str
@@ -290,6 +292,8 @@ def replace_image(image_el, new_image_path):
     os.replace(new_image_path, image_placeholder_path)
 
     # adjust new image size
+    from PIL import Image
+
     img = Image.open(image_placeholder_path)
     word.adjust_image_size(image_el, img.height, img.width)
 
@@ -337,23 +341,28 @@ def clean_working_dir():
 
 
 def finalize_report(report_file_path: str):
-    # archive directory
-    shutil.make_archive(
-        "report",
-        "zip",
-        WORKING_DIR_PATH,
-    )
-    # change it's extension to ".docx" and move to the right directory
-    os.rename("report.zip", report_file_path)
+    # archive directory (sorted entries with fixed timestamps,
+    # so the same data always gives byte identical report)
+    files = []
+    for root, dirs, names in os.walk(WORKING_DIR_PATH):
+        dirs.sort()
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, WORKING_DIR_PATH).replace(os.sep, "/"), path))
 
+    with zipfile.ZipFile(report_file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for archive_name, path in sorted(files):
+            info = zipfile.ZipInfo(archive_name, date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, "rb") as file:
+                archive.writestr(info, file.read())
 
-def get_issues_plot(project: Projects, report_date: datetime):
-    intervals, blockers_per_interval = get_issues_statistic(
-        project, report_date, IssueType.BLOCKER
-    )
-    _, criticals_per_interval = get_issues_statistic(
-        project, report_date, IssueType.CRITICAL
-    )
+
+def get_issues_plot(project: Projects, issues_statistic: Dict[IssueType, Tuple]):
+    import plotly.graph_objects as go
+
+    intervals, blockers_per_interval = issues_statistic[IssueType.BLOCKER]
+    _, criticals_per_interval = issues_statistic[IssueType.CRITICAL]
 
     different_values = len(
         set(blockers_per_interval + criticals_per_interval)
@@ -424,53 +433,44 @@ def get_issues_plot(project: Projects, report_date: datetime):
     return path
 
 
-def main():
-    # eval report dates
-    report_date = datetime.now()
-    report_start_date = report_date - timedelta(weeks=2) + timedelta(days=1)
-
-    report_path = REPORT_FILE_PATH.format(date=report_date.strftime("%d-%m-%Y"))
-
-    prepare_working_directory(report_path)
-    print("[0/12] Initial preparations...")
-
-    # load document.xml (main xml file)
-    tree = word.load_xml(word.DOCUMENT_PATH)
+def create_deadline() -> Deadline:
+    return Deadline(REPORT_DEADLINE, STAGE_SHARES, DEFAULT_STAGE_SHARE)
 
-    # validate template
-    if not template_validation(tree):
-        print("Template is invalid! Some IDs are missing!")
-        exit()
 
+@dataclass
+class RenderContext:
+    tree: etree.Element
+    data: ReportData
+    deadline: Deadline
+    checkpoint: Checkpoint
     # statistic for page allignment
-    project_added_elements = {project: 0 for project in Projects}
+    project_added_elements: Dict[Projects, int]
+    projects_with_charts: Set[Projects] = field(default_factory=set)
 
-    ###############################################################
-    # update projects status table
-    print("[1/12] Projects status table...")
 
-    blockers = get_blockers(report_date)
-    crits = get_crits(report_date)
+def render_projects_status_table(context: RenderContext):
+    data = context.data
 
-    for project in ids.BUILD_STATUS_TABLE_ROW:
-        if project not in [Projects.WML, Projects.INVENTOR]:
-            build_data = get_latest_build_data(project)
-            fill_build_status_table(
-                tree, project, build_data, blockers, crits, report_date
-            )
+    for project, build_data in data.build_data.items():
+        fill_build_status_table(
+            context.tree, project, build_data, data.blockers, data.crits, data.report_date
+        )
 
     # WML link should be placed on the project page instead of projects table
-    wml_report_link = get_wml_report_link()
-    word.update_link(
-        tree, link_id=ids.WML_BUILD_LINK, url=wml_report_link, text="Weekly report"
-    )
+    if data.wml_report_link is not None:
+        word.update_link(
+            context.tree,
+            link_id=ids.WML_BUILD_LINK,
+            url=data.wml_report_link,
+            text="Weekly report",
+        )
 
-    ###############################################################
-    # update summary table
-    print("[2/12] Summary table...")
+
+def render_summary_table(context: RenderContext):
+    tree = context.tree
 
     # Found issues
-    found_issues = get_bugs(report_date)
+    found_issues = context.data.bugs
 
     for project in found_issues:
         if project in [
@@ -487,82 +487,69 @@ def main():
         word.set_table_cell_value(table_cell, Link(url=url, text=text))
 
     # Merged PRs
-    for project in ids.SUMMARY_TABLE:
-        if project in [ Projects.SOLIDWORKS]:
-            continue # skip Solidworks in this table for now
+    for project, merged_prs in context.data.merged_prs.items():
         table_cell_id = ids.SUMMARY_TABLE[project][SummaryTableColumn.MERGED_PRS]
         table_cell = word.find_by_id(tree, table_cell_id)
 
-        merged_prs = get_merged_prs(project, report_date)
-
         url = merged_prs["link"]
         text = "PRs ({amount})".format(amount=merged_prs["count"])
 
         word.set_table_cell_value(table_cell, Link(url=url, text=text))
 
-    ###############################################################
-    # update issues plots
-    print("[3/12] Issue plots...")
+
+def render_issue_plots(context: RenderContext):
+    issues_statistic = context.data.issues_statistic
 
     for project in ids.ISSUES_PLOT:
+        # skip plot if its data wasn't fetched in time
+        if len(issues_statistic.get(project, {})) < len(IssueType):
+            continue
+
         plot_id = ids.ISSUES_PLOT[project]
-        plot = word.find_by_id(tree, plot_id)
+        plot = word.find_by_id(context.tree, plot_id)
 
-        plot_file_path = get_issues_plot(project, report_date)
+        # (past points are taken from snapshots of previous reports)
+        plot_file_path = get_issues_plot(project, issues_statistic[project])
 
         replace_image(image_el=plot, new_image_path=plot_file_path)
 
-    ###############################################################
-    # update PRs status tables
-    print("[4/12] PRs status tables...")
 
-    for project in ids.PR_STATUS_TABLE_ID:
-        if project in [Projects.SOLIDWORKS]:
-            continue
-        # skip solidworks for now
-        data = get_pull_requests_status(project, report_date)
-        if not data:
-            remove_pr_table(tree, project)
-            project_added_elements[project] -= 3
+def render_pr_status_tables(context: RenderContext):
+    for project, pull_requests in context.data.pull_requests.items():
+        if not pull_requests:
+            remove_pr_table(context.tree, project)
+            context.project_added_elements[project] -= 3
         else:
-            fill_pr_table(tree, project, data)
-            project_added_elements[project] += len(data)
-
-    ###############################################################
-    # import tasks
-    print("[5/12] Task lists...")
+            fill_pr_table(context.tree, project, pull_requests)
+            context.project_added_elements[project] += len(pull_requests)
 
-    projects_tasks = get_tasks(report_date)
 
+def render_task_lists(context: RenderContext):
     for project in ids.TASK_LISTS_ID:
-        tasks = projects_tasks[project]
+        tasks = context.data.tasks.get(project, [])
         task_lists = ids.TASK_LISTS_ID[project]
 
-        fill_task_lists(tree, task_lists, tasks)
+        fill_task_lists(context.tree, task_lists, tasks)
 
-        project_added_elements[project] += len(tasks)
+        context.project_added_elements[project] += len(tasks)
 
-    ###############################################################
-    # fill main tasks table
-    print("[6/12] Main tasks...")
 
-    main_tasks = get_main_tasks(projects_tasks)
+def render_main_tasks(context: RenderContext):
+    main_tasks = get_main_tasks(context.data.tasks)
 
     # fill summary task list with important tasks
-    elem = word.find_by_id(tree, ids.MAIN_TASKS_LIST)
+    elem = word.find_by_id(context.tree, ids.MAIN_TASKS_LIST)
     for task in main_tasks:
         elem = add_main_tasks_bullet_list_element(elem, task)
 
-    ###############################################################
-    # fill blockers list
-    print("[7/12] Blockers list...")
 
-    blockers_by_proj = get_blockers(report_date)
+def render_blockers_list(context: RenderContext):
+    blockers_by_proj = context.data.blockers
     blockers = []
     for project in blockers_by_proj:
         blockers.extend(blockers_by_proj[project])
 
-    blocker_list_header = word.find_by_id(tree, ids.BLOCKERS_LIST)
+    blocker_list_header = word.find_by_id(context.tree, ids.BLOCKERS_LIST)
 
     if blockers:
         # fill blockers in list
@@ -575,11 +562,9 @@ def main():
     else:  # remove blockers header
         word.remove_element(blocker_list_header)
 
-    ###############################################################
-    # update bugs links
-    print("[8/12] Bugs links...")
 
-    projects_bugs = get_bugs(report_date)
+def render_bugs_links(context: RenderContext):
+    projects_bugs = context.data.bugs
 
     for project in projects_bugs:
         if project in [
@@ -595,12 +580,16 @@ def main():
 
         # update link address
         word.update_link(
-            tree, link_id=link_id, url=projects_bugs[project]["link"], text=description
+            context.tree,
+            link_id=link_id,
+            url=projects_bugs[project]["link"],
+            text=description,
         )
 
-    ###############################################################
-    # update report period in footer
-    print("[9/12] Report dates...")
+
+def render_report_dates(context: RenderContext):
+    report_date = context.data.report_date
+    report_start_date = report_date - timedelta(weeks=2) + timedelta(days=1)
 
     footer_tree = word.load_xml(word.FOOTER_PATH)
 
@@ -612,14 +601,28 @@ def main():
 
     word.write_xml(footer_tree, word.FOOTER_PATH)
 
-    ###############################################################
-    # import images
-    print("[10/12] Charts...")
 
-    available_charts = export_charts()
-
-    # for pages allignment
-    projects_with_charts = set()
+def render_charts(context: RenderContext):
+    from charts_export import export_charts
+
+    tree = context.tree
+
+    # without charts in time all of them are replaced with notes about absence
+    # (exported charts are kept in checkpoint, so they aren't requested again on resume)
+    available_charts = context.deadline.run(
+        "charts",
+        context.checkpoint.call,
+        "charts export",
+        digest(context.data.report_date),
+        fixtures.replayable,
+        "charts",
+        export_charts,
+        context.data.report_date,
+        default={
+            project: {chart_type: None for chart_type in ChartType}
+            for project in ids.CHART_ID
+        },
+    )
 
     for project in ids.CHART_ID:
         for chart_type in ChartType:
@@ -629,7 +632,7 @@ def main():
                 update_chart(tree, project, chart_type, new_chart_path)
 
                 # remember this project for further allignment
-                projects_with_charts.add(project)
+                context.projects_with_charts.add(project)
             else:
                 # remove chart and chart header if there is no chart
                 remove_chart(tree, project, chart_type)
@@ -638,8 +641,8 @@ def main():
     # fix images overlap with footer
     # add page break if there are more than 7 added elements (table + task lists)
 
-    for project in projects_with_charts:
-        if project_added_elements[project] >= 8:  # magic number
+    for project in context.projects_with_charts:
+        if context.project_added_elements[project] >= 8:  # magic number
             # create page break element
             page_break = word.create_page_break()
 
@@ -647,26 +650,134 @@ def main():
             bugs_link_paragraph = word.find_by_id(tree, ids.BUGS_LINK_ID[project])
             word.append_element_after(new_el=page_break, after=bugs_link_paragraph)
 
-    ###############################################################
-    # import wml plot
-    print("[11/12] WML chart...")
 
-    wml_chart_path = export_wml_chart()
+def render_wml_chart(context: RenderContext):
+    from wml_chart_export import export_wml_chart
+
+    wml_chart_path = context.deadline.run(
+        "wml chart",
+        context.checkpoint.call,
+        "wml chart export",
+        digest(context.data.report_date),
+        fixtures.replayable,
+        "wml_chart",
+        export_wml_chart,
+    )
 
     # if new chart available
     if wml_chart_path is None:
         print("ERROR: No WML chart in the report!!!")
         exit(-1)
 
-    image_el = word.find_by_id(tree, ids.WML_CHART_ID)
+    image_el = word.find_by_id(context.tree, ids.WML_CHART_ID)
     # replace chart image
     replace_image(image_el, wml_chart_path)
 
-    ###############################################################
-    print("[12/12] Saving report...")
 
-    # save report document.xml
-    word.write_xml(tree, word.DOCUMENT_PATH)
+# (stage name, title, function, report data fields used by stage)
+RENDER_STAGES = [
+    (
+        "projects status table",
+        "Projects status table",
+        render_projects_status_table,
+        ["report_date", "build_data", "blockers", "crits", "wml_report_link"],
+    ),
+    ("summary table", "Summary table", render_summary_table, ["bugs", "merged_prs"]),
+    (
+        "issue plots",
+        "Issue plots",
+        render_issue_plots,
+        ["issues_statistic"],
+    ),
+    ("prs status tables", "PRs status tables", render_pr_status_tables, ["pull_requests"]),
+    ("task lists", "Task lists", render_task_lists, ["tasks"]),
+    ("main tasks", "Main tasks", render_main_tasks, ["tasks"]),
+    ("blockers list", "Blockers list", render_blockers_list, ["blockers"]),
+    ("bugs links", "Bugs links", render_bugs_links, ["bugs"]),
+    ("report dates", "Report dates", render_report_dates, ["report_date"]),
+    ("charts", "Charts", render_charts, ["report_date"]),
+    ("wml chart", "WML chart", render_wml_chart, ["report_date"]),
+]
+
+
+def get_stages_inputs(data: ReportData) -> List[str]:
+    # each stage changes document after the previous ones,
+    # so its inputs include inputs of all previous stages
+    stages_inputs = []
+    inputs = template_digest()
+    for name, _, _, fields in RENDER_STAGES:
+        inputs = digest(inputs, name, *[getattr(data, field_name) for field_name in fields])
+        stages_inputs.append(inputs)
+
+    return stages_inputs
+
+
+def render_report(data: ReportData, deadline: Deadline, checkpoint: Checkpoint):
+    report_path = REPORT_FILE_PATH.format(date=data.report_date.strftime("%d-%m-%Y"))
+    stages_count = len(RENDER_STAGES) + 1
+
+    prepare_working_directory(report_path)
+    print(f"[0/{stages_count}] Initial preparations...")
+    deadline.start_stage("preparations")
+
+    # completed stages with unchanged inputs are restored from checkpoint
+    stages_inputs = get_stages_inputs(data)
+    restored_stages = 0
+    while restored_stages < len(RENDER_STAGES) and checkpoint.is_done(
+        RENDER_STAGES[restored_stages][0], stages_inputs[restored_stages]
+    ):
+        restored_stages += 1
+
+    project_added_elements = {project: 0 for project in Projects}
+    projects_with_charts: Set[Projects] = set()
+    if restored_stages > 0:
+        project_added_elements, projects_with_charts = checkpoint.restore_document(
+            RENDER_STAGES[restored_stages - 1][0]
+        )
+
+    # load document.xml (main xml file)
+    tree = word.load_xml(word.DOCUMENT_PATH)
+
+    # validate template
+    if restored_stages == 0 and not template_validation(tree):
+        print("Template is invalid! Some IDs are missing!")
+        exit()
+
+    context = RenderContext(
+        tree=tree,
+        data=data,
+        deadline=deadline,
+        checkpoint=checkpoint,
+        project_added_elements=project_added_elements,
+        projects_with_charts=projects_with_charts,
+    )
+
+    complete = True
+    for number, (name, title, render_stage, _) in enumerate(RENDER_STAGES, start=1):
+        print(f"[{number}/{stages_count}] {title}...")
+        deadline.start_stage(name)
+
+        if number <= restored_stages:
+            print(f"Stage '{name}' is restored from checkpoint")
+            continue
+
+        render_stage(context)
+
+        # save document.xml, so checkpoint contains the partially filled document
+        word.write_xml(context.tree, word.DOCUMENT_PATH)
+
+        # stage rendered without data cut by deadline (and stages after it) is repeated on resume
+        complete = complete and name not in deadline.cancelled
+        if complete:
+            checkpoint.save_document(
+                name,
+                stages_inputs[number - 1],
+                (context.project_added_elements, context.projects_with_charts),
+            )
+
+    ###############################################################
+    print(f"[{stages_count}/{stages_count}] Saving report...")
+    deadline.start_stage("saving")
 
     # combine files into docx
     finalize_report(report_path)
@@ -676,5 +787,45 @@ def main():
     clean_working_dir()
 
 
+def main(resume: bool = False):
+    # replayed report uses the date of recorded one
+    checkpoint = Checkpoint(fixtures.report_date(datetime.now()), resume)
+    report_date = checkpoint.report_date
+
+    # every remote dataset should be requested only once per report
+    memo.reset()
+
+    deadline = create_deadline()
+
+    # check all tokens before any long running work
+    # (replayed responses don't need any credentials)
+    if not fixtures.is_replaying():
+        print("Checking credentials...")
+        deadline.start_stage("credentials")
+        if not validate_credentials():
+            exit(-1)
+
+    # request all data from jira, github, jenkins and confluence at once
+    print("Fetching report data...")
+    deadline.start_stage("fetch")
+    data = checkpoint.call(
+        "fetch",
+        digest(report_date),
+        prefetch_report_data,
+        report_date,
+        deadline.stage_timeout("fetch"),
+        is_complete=lambda data: not data.cancelled,
+    )
+
+    # replayed report shouldn't depend on (and change) local history
+    if not fixtures.is_replaying():
+        snapshots.update_snapshots(data)
+
+    render_report(data, deadline, checkpoint)
+
+    deadline.finish()
+    memo.print_stats()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,92 @@
+import threading
+from time import perf_counter
+from functools import wraps
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+# results of exporter calls made during current report run
+_results: Dict[Tuple, Future] = {}
+# {function name: {"hits": int, "misses": int, "time": float}}
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+# amount of memoized calls in progress in current thread
+_local = threading.local()
+
+
+def memoize(function: Callable) -> Callable:
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        # arguments are (project, report date, ...), so each remote dataset has own key
+        key = (name, args, tuple(sorted(kwargs.items())))
+
+        with _lock:
+            stats = _stats.setdefault(name, {"hits": 0, "misses": 0, "time": 0.0})
+            future = _results.get(key)
+            is_owner = future is None
+            if is_owner:
+                # concurrent callers with the same key will wait for this result
+                future = Future()
+                _results[key] = future
+                stats["misses"] += 1
+            else:
+                stats["hits"] += 1
+
+        if is_owner:
+            depth = getattr(_local, "depth", 0)
+            _local.depth = depth + 1
+            start = perf_counter()
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as e:
+                # don't remember failures, next call will try again
+                with _lock:
+                    del _results[key]
+                future.set_exception(e)
+                raise
+            finally:
+                _local.depth = depth
+                # time of nested memoized calls is already counted by the outer one
+                if depth == 0:
+                    with _lock:
+                        stats["time"] += perf_counter() - start
+
+        return future.result()
+
+    return wrapper
+
+
+def reset():
+    with _lock:
+        _results.clear()
+        _stats.clear()
+
+
+def get_stats() -> Dict[str, Dict[str, float]]:
+    with _lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def get_total_time() -> float:
+    # time of all remote datasets if they were requested one by one
+    # (each dataset is counted once, no matter how many callers waited for it)
+    with _lock:
+        return sum(stats["time"] for stats in _stats.values())
+
+
+def print_stats():
+    stats = get_stats()
+    hits = sum(function_stats["hits"] for function_stats in stats.values())
+    misses = sum(function_stats["misses"] for function_stats in stats.values())
+
+    print(f"Memoized exporter calls: {hits} hits, {misses} misses")
+    for name, function_stats in sorted(stats.items()):
+        print(
+            "\t{name}: {hits} hits, {misses} misses, {time:.1f}s".format(
+                name=name,
+                hits=function_stats["hits"],
+                misses=function_stats["misses"],
+                time=function_stats["time"],
+            )
+        )
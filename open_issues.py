@@ -0,0 +1,140 @@
+import os
+import calendar
+import random
+from time import perf_counter
+from datetime import date, timedelta
+from typing import List, Sequence, Tuple
+import numpy as np
+
+# size and amount of buckets in issues plots
+ISSUES_PLOT_BUCKET = os.getenv("ISSUES_PLOT_BUCKET", "weekly")  # daily, weekly or monthly
+ISSUES_PLOT_PERIODS = int(os.getenv("ISSUES_PLOT_PERIODS", "26"))
+
+BUCKET_DAYS = {
+    "daily": 1,
+    "weekly": 7,
+}
+
+
+def _shift_months(day: date, months: int) -> date:
+    # the same day of another month (or the last day of shorter month)
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    last_day = calendar.monthrange(year, month + 1)[1]
+    return date(year, month + 1, min(day.day, last_day))
+
+
+def get_buckets(
+    report_date: date,
+    bucket: str = ISSUES_PLOT_BUCKET,
+    periods: int = ISSUES_PLOT_PERIODS,
+) -> List[Tuple[date, date]]:
+    # (start, end) of each bucket, the last one ends at the report date
+    if bucket == "monthly":
+        ends = [_shift_months(report_date, -shift) for shift in range(periods + 1)]
+    elif bucket in BUCKET_DAYS:
+        step = timedelta(days=BUCKET_DAYS[bucket])
+        ends = [report_date - step * shift for shift in range(periods + 1)]
+    else:
+        raise ValueError(f"Unknown issues plot bucket '{bucket}'")
+
+    ends = ends[::-1]
+    return list(zip(ends[:-1], ends[1:]))
+
+
+# day number of numpy datetime epoch
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def to_days(dates: Sequence[str]) -> np.ndarray:
+    # ISO dates ("YYYY-MM-DD") as day numbers (the same as date.toordinal()),
+    # numpy parses strings much faster than python creates date objects
+    return np.array(dates, dtype="datetime64[D]").astype(np.int64) + EPOCH_DAY
+
+
+def count_open_issues(
+    opened: np.ndarray, closed: np.ndarray, buckets: List[Tuple[date, date]]
+) -> List[int]:
+    # amount of issues which were open at any moment of each bucket:
+    # opened before bucket end and closed after bucket start
+    # (opening and closing days are arrays of to_days() in any order)
+    if not buckets:
+        return []
+
+    # days are counted from the first day of the plot
+    origin = buckets[0][0].toordinal()
+    days = buckets[-1][1].toordinal() - origin + 1
+
+    opened_days = opened - origin
+    # issue can't be closed before it was opened (broken status change dates)
+    closed_days = np.maximum(closed - origin, opened_days)
+
+    def cumulative_events(event_days: np.ndarray) -> np.ndarray:
+        # amount of events on or before each day of the plot,
+        # events before the plot are counted on its first day, events after it are dropped
+        offsets = np.clip(event_days, 0, days)
+        return np.cumsum(np.bincount(offsets, minlength=days + 1)[:days])
+
+    opened_by = cumulative_events(opened_days)
+    closed_by = cumulative_events(closed_days)
+
+    starts = np.array([start.toordinal() for start, _ in buckets]) - origin
+    ends = np.array([end.toordinal() for _, end in buckets]) - origin
+
+    # issues closed before bucket start were opened before its end too
+    return (opened_by[ends] - closed_by[starts]).tolist()
+
+
+def _count_open_issues_loop(
+    issues: List[dict], buckets: List[Tuple[date, date]]
+) -> List[int]:
+    # previous implementation (issues should be sorted by opening date)
+    issues_per_interval = [0 for _ in buckets]
+
+    i = 0
+    j = 0
+    for issue in issues:
+        while i < len(buckets) and issue["from"] > buckets[i][1]:
+            i += 1
+        j = i
+        while j < len(buckets) and issue["to"] > buckets[j][0]:
+            issues_per_interval[j] += 1
+            j += 1
+
+    return issues_per_interval
+
+
+if __name__ == "__main__":
+    # benchmark against the previous loop
+    report_date = date.today()
+    buckets = get_buckets(report_date, "weekly", 26)
+
+    for amount in (1000, 10000, 50000):
+        issues = []
+        for _ in range(amount):
+            opened = report_date - timedelta(days=random.randint(0, 400))
+            closed = opened + timedelta(days=random.randint(0, 200))
+            issues.append({"from": opened, "to": min(closed, report_date)})
+        issues.sort(key=lambda issue: issue["from"])
+
+        start = perf_counter()
+        expected = _count_open_issues_loop(issues, buckets)
+        loop_time = perf_counter() - start
+
+        # jira returns dates as strings
+        opened_dates = [issue["from"].isoformat() for issue in issues]
+        closed_dates = [issue["to"].isoformat() for issue in issues]
+
+        start = perf_counter()
+        opened = to_days(opened_dates)
+        closed = to_days(closed_dates)
+        conversion_time = perf_counter() - start
+
+        start = perf_counter()
+        counts = count_open_issues(opened, closed, buckets)
+        numpy_time = perf_counter() - start
+
+        assert counts == expected
+        print(
+            f"{amount} issues: loop {loop_time * 1000:.2f}ms, numpy {numpy_time * 1000:.2f}ms (+{conversion_time * 1000:.2f}ms dates conversion)"
+        )
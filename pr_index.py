@@ -0,0 +1,125 @@
+import os
+import json
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+import numpy as np
+from common import Projects
+from memo import memoize
+import fixtures
+from github_export import projects_info, _request_pages
+from open_issues import get_buckets, to_days
+
+# pull requests throughput isn't rendered in report, so it's synced only on demand
+PR_THROUGHPUT = os.getenv("PR_THROUGHPUT", "0") == "1"
+PR_INDEX_PATH = os.getenv("PR_INDEX_PATH", "./pr_index/")
+# amount of weeks in pull requests throughput series
+PR_THROUGHPUT_PERIODS = int(os.getenv("PR_THROUGHPUT_PERIODS", "26"))
+
+
+def _is_persistent() -> bool:
+    # recorded and replayed fixtures should contain all requests of the sync
+    return not (fixtures.is_recording() or fixtures.is_replaying())
+
+
+def _index_path(owner: str, name: str) -> str:
+    return os.path.join(PR_INDEX_PATH, f"{owner}_{name}.json")
+
+
+def load_index(owner: str, name: str) -> dict:
+    # {"cursor": the latest updated_at of synced pull requests,
+    #  "pull_requests": {number: {"state", "created_at", "merged_at", "closed_at"}}}
+    path = _index_path(owner, name)
+    if not os.path.exists(path):
+        return {"cursor": None, "pull_requests": {}}
+
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_index(owner: str, name: str, index: dict):
+    os.makedirs(PR_INDEX_PATH, exist_ok=True)
+
+    path = _index_path(owner, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(index, file)
+    os.replace(tmp_path, path)
+
+
+@memoize
+def sync_index(owner: str, name: str, report_date: datetime) -> Dict[str, dict]:
+    # request only pull requests updated since the last sync
+    index = load_index(owner, name) if _is_persistent() else {"cursor": None, "pull_requests": {}}
+
+    cursor = index["cursor"]
+    if cursor is None:
+        # the first sync is limited to pull requests which can appear in the series
+        plot_start = get_buckets(report_date.date(), "weekly", PR_THROUGHPUT_PERIODS)[0][0]
+        cursor = plot_start.strftime("%Y-%m-%dT00:00:00Z")
+
+    url = f"https://api.github.com/repos/{owner}/{name}/pulls?state=all&sort=updated&direction=desc&per_page=100"
+
+    # pull requests are sorted by the last update, so the rest ones weren't changed
+    updated = 0
+    newest = cursor
+    for pr in _request_pages(url, stop=lambda pr: pr["updated_at"] < cursor):
+        index["pull_requests"][str(pr["number"])] = {
+            "state": pr["state"],
+            "created_at": pr["created_at"],
+            "merged_at": pr.get("merged_at", None),
+            "closed_at": pr.get("closed_at", None),
+        }
+        newest = max(newest, pr["updated_at"])
+        updated += 1
+
+    index["cursor"] = newest
+    if _is_persistent():
+        save_index(owner, name, index)
+
+    print(f"PR index of {owner}/{name} synced: {updated} updated pull requests")
+
+    return index["pull_requests"]
+
+
+def _count_weekly(timestamps: List[str], buckets: List[Tuple[date, date]]) -> List[int]:
+    # amount of timestamps in (start, end] of each bucket
+    days = np.sort(to_days([timestamp[:10] for timestamp in timestamps]))
+
+    starts = np.array([start.toordinal() for start, _ in buckets])
+    ends = np.array([end.toordinal() for _, end in buckets])
+
+    return (
+        np.searchsorted(days, ends, side="right") - np.searchsorted(days, starts, side="right")
+    ).tolist()
+
+
+def get_prs_throughput(
+    project: Projects, report_date: datetime
+) -> Tuple[List[date], Dict[str, List[int]]]:
+    # ([week ends], {"opened": [amount per week], "merged": [amount per week]})
+    pull_requests = sync_index(
+        projects_info[project]["owner"], projects_info[project]["name"], report_date
+    ).values()
+
+    buckets = get_buckets(report_date.date(), "weekly", PR_THROUGHPUT_PERIODS)
+
+    return [end for _, end in buckets], {
+        "opened": _count_weekly([pr["created_at"] for pr in pull_requests], buckets),
+        "merged": _count_weekly(
+            [pr["merged_at"] for pr in pull_requests if pr["merged_at"]], buckets
+        ),
+    }
+
+
+if __name__ == "__main__":
+    for project in projects_info:
+        weeks, throughput = get_prs_throughput(project, datetime.now())
+        print(projects_info[project]["name"] + ":")
+        for i, week in enumerate(weeks):
+            print(
+                "\t{week}: opened {opened}, merged {merged}".format(
+                    week=week.strftime("%d-%m-%Y"),
+                    opened=throughput["opened"][i],
+                    merged=throughput["merged"][i],
+                )
+            )
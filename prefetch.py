@@ -0,0 +1,300 @@
+import os
+import pickle
+import threading
+from time import perf_counter
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import ids
+from common import Projects, IssueType, Service
+import memo
+import rate_limit
+import deadline
+
+# amount of concurrent requests per service
+SERVICE_WORKERS = {
+    Service.JIRA: int(os.getenv("JIRA_WORKERS", "4")),
+    Service.GITHUB: int(os.getenv("GITHUB_WORKERS", "4")),
+    Service.JENKINS: int(os.getenv("JENKINS_WORKERS", "4")),
+    Service.CONFLUENCE: int(os.getenv("CONFLUENCE_WORKERS", "2")),
+}
+
+# projects which are skipped in the corresponding report sections
+BUILD_STATUS_SKIPPED_PROJECTS = [Projects.WML, Projects.INVENTOR]
+PR_STATUS_SKIPPED_PROJECTS = [Projects.SOLIDWORKS]
+MERGED_PRS_SKIPPED_PROJECTS = [Projects.SOLIDWORKS]
+
+# report data fields filled by each service
+SERVICE_FIELDS = {
+    Service.JIRA: ["blockers", "crits", "bugs", "issues_statistic"],
+    Service.GITHUB: ["pull_requests", "merged_prs", "prs_throughput"],
+    Service.JENKINS: ["build_data", "wml_report_link"],
+    Service.CONFLUENCE: ["tasks"],
+}
+
+
+@dataclass
+class ReportData:
+    report_date: datetime
+    blockers: Dict[Projects, List[dict]] = field(default_factory=dict)
+    crits: Dict[Projects, List[dict]] = field(default_factory=dict)
+    bugs: Dict[Projects, dict] = field(default_factory=dict)
+    issues_statistic: Dict[Projects, Dict[IssueType, Tuple[List, List]]] = field(
+        default_factory=dict
+    )
+    build_data: Dict[Projects, dict] = field(default_factory=dict)
+    wml_report_link: Optional[str] = None
+    pull_requests: Dict[Projects, List[dict]] = field(default_factory=dict)
+    merged_prs: Dict[Projects, dict] = field(default_factory=dict)
+    # weekly opened/merged pull requests {project: ([week ends], {series: counts})}
+    prs_throughput: Dict[Projects, Tuple[List, Dict[str, List[int]]]] = field(
+        default_factory=dict
+    )
+    tasks: Dict[Projects, List[dict]] = field(default_factory=dict)
+    # history of previous reports {project: {date: values}} (see snapshots.py)
+    snapshots: Dict[Projects, Dict[date, dict]] = field(default_factory=dict)
+    # keys of sources which were cancelled by deadline (data isn't complete)
+    cancelled: List[Tuple] = field(default_factory=list)
+
+    def update(self, other: "ReportData", services: Iterable[Service]):
+        # replace data of the specified services with data from other report
+        self.report_date = other.report_date
+        for service in services:
+            for name in SERVICE_FIELDS[service]:
+                setattr(self, name, getattr(other, name))
+
+            self.cancelled = [
+                key for key in self.cancelled if key[0] not in SERVICE_FIELDS[service]
+            ] + [key for key in other.cancelled if key[0] in SERVICE_FIELDS[service]]
+
+
+# (service, result key, exporter function, arguments)
+Job = Tuple[Service, Tuple, Callable, Tuple]
+
+
+def _plan_jira_jobs(report_date: datetime) -> List[Job]:
+    from jira_export import (
+        projects_jira_names,
+        get_project_blockers,
+        get_project_crits,
+        get_project_bugs,
+        get_issues_statistic,
+    )
+
+    jobs: List[Job] = []
+
+    for project in projects_jira_names:
+        jobs.append(
+            (Service.JIRA, ("blockers", project), get_project_blockers, (project, report_date))
+        )
+        jobs.append(
+            (Service.JIRA, ("crits", project), get_project_crits, (project, report_date))
+        )
+        jobs.append(
+            (Service.JIRA, ("bugs", project), get_project_bugs, (project, report_date))
+        )
+
+    # all plots share one issues history request
+    plotted_projects = tuple(ids.ISSUES_PLOT)
+    for project in plotted_projects:
+        for issue_type in IssueType:
+            jobs.append(
+                (
+                    Service.JIRA,
+                    ("issues_statistic", project, issue_type),
+                    get_issues_statistic,
+                    (project, report_date, issue_type, plotted_projects),
+                )
+            )
+
+    return jobs
+
+
+def _plan_github_jobs(report_date: datetime) -> List[Job]:
+    from github_export import projects_info, get_pull_requests_status, get_merged_prs
+    from pr_index import PR_THROUGHPUT, get_prs_throughput
+
+    jobs: List[Job] = []
+
+    for project in ids.PR_STATUS_TABLE_ID:
+        if project not in PR_STATUS_SKIPPED_PROJECTS:
+            jobs.append(
+                (
+                    Service.GITHUB,
+                    ("pull_requests", project),
+                    get_pull_requests_status,
+                    (project, report_date),
+                )
+            )
+
+    for project in ids.SUMMARY_TABLE:
+        if project not in MERGED_PRS_SKIPPED_PROJECTS:
+            jobs.append(
+                (Service.GITHUB, ("merged_prs", project), get_merged_prs, (project, report_date))
+            )
+
+    if PR_THROUGHPUT:
+        for project in projects_info:
+            jobs.append(
+                (
+                    Service.GITHUB,
+                    ("prs_throughput", project),
+                    get_prs_throughput,
+                    (project, report_date),
+                )
+            )
+
+    return jobs
+
+
+def _plan_jenkins_jobs(report_date: datetime) -> List[Job]:
+    from jenkins_export import get_latest_build_data, get_wml_report_link
+
+    jobs: List[Job] = []
+
+    for project in ids.BUILD_STATUS_TABLE_ROW:
+        if project not in BUILD_STATUS_SKIPPED_PROJECTS:
+            jobs.append(
+                (Service.JENKINS, ("build_data", project), get_latest_build_data, (project,))
+            )
+
+    jobs.append((Service.JENKINS, ("wml_report_link",), get_wml_report_link, ()))
+
+    return jobs
+
+
+def _plan_confluence_jobs(report_date: datetime) -> List[Job]:
+    from confluence_export import get_projects_info, get_tasks_report_dates
+
+    previous_thursday, last_thursday = get_tasks_report_dates(report_date)
+
+    return [
+        (Service.CONFLUENCE, ("tasks", "old"), get_projects_info, (previous_thursday,)),
+        (Service.CONFLUENCE, ("tasks", "new"), get_projects_info, (last_thursday,)),
+    ]
+
+
+# exporter modules are imported only for requested services
+JOB_PLANNERS = {
+    Service.JIRA: _plan_jira_jobs,
+    Service.GITHUB: _plan_github_jobs,
+    Service.JENKINS: _plan_jenkins_jobs,
+    Service.CONFLUENCE: _plan_confluence_jobs,
+}
+
+
+def _format_key(key: Tuple) -> str:
+    return " ".join(part.name if isinstance(part, Enum) else str(part) for part in key)
+
+
+def _collect(
+    report_date: datetime, results: Dict[Tuple, Any], cancelled: List[Tuple]
+) -> ReportData:
+    def by_project(name: str) -> Dict:
+        return {key[1]: value for key, value in results.items() if key[0] == name}
+
+    issues_statistic: Dict = {}
+    for key, value in results.items():
+        if key[0] == "issues_statistic":
+            issues_statistic.setdefault(key[1], {})[key[2]] = value
+
+    # sources cancelled by deadline are missing in results
+    tasks = {}
+    if ("tasks", "new") in results:
+        from confluence_export import merge_tasks
+
+        tasks = merge_tasks(results.get(("tasks", "old"), {}), results[("tasks", "new")])
+
+    return ReportData(
+        report_date=report_date,
+        blockers=by_project("blockers"),
+        crits=by_project("crits"),
+        bugs=by_project("bugs"),
+        issues_statistic=issues_statistic,
+        build_data=by_project("build_data"),
+        wml_report_link=results.get(("wml_report_link",)),
+        pull_requests=by_project("pull_requests"),
+        merged_prs=by_project("merged_prs"),
+        prs_throughput=by_project("prs_throughput"),
+        tasks=tasks,
+        cancelled=cancelled,
+    )
+
+
+def prefetch_report_data(
+    report_date: datetime,
+    timeout: Optional[float] = None,
+    services: Iterable[Service] = tuple(Service),
+) -> ReportData:
+    jobs: List[Job] = []
+    for service in services:
+        jobs.extend(JOB_PLANNERS[service](report_date))
+
+    # one bounded pool per service, so slow service doesn't starve the others
+    executors = {
+        service: ThreadPoolExecutor(
+            max_workers=SERVICE_WORKERS[service],
+            thread_name_prefix=f"prefetch-{service.name.lower()}",
+        )
+        for service in services
+    }
+
+    start = perf_counter()
+    # jobs share memoized datasets, so the time of datasets is summed instead of jobs
+    requests_time = memo.get_total_time()
+    results: Dict[Tuple, Any] = {}
+    cancelled: List[Tuple] = []
+    # running jobs stop sending requests when it's set
+    cancel_event = threading.Event()
+
+    try:
+        futures = {
+            key: executors[service].submit(deadline.cancellable, cancel_event, function, *args)
+            for service, key, function, args in jobs
+        }
+
+        # sources which don't respond in time are cancelled instead of blocking the report
+        wait(futures.values(), timeout=timeout)
+
+        for key, future in futures.items():
+            if not future.done():
+                future.cancel()
+                cancelled.append(key)
+                print(f"WARNING: '{_format_key(key)}' request was cancelled by deadline")
+                continue
+
+            results[key] = future.result()
+    finally:
+        cancel_event.set()
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    wall_time = perf_counter() - start
+    sequential_time = memo.get_total_time() - requests_time
+    print(
+        "Fetched {count} datasets in {wall:.1f}s (sequential: {sequential:.1f}s, saved: {saved:.1f}s)".format(
+            count=len(results),
+            wall=wall_time,
+            sequential=sequential_time,
+            saved=sequential_time - wall_time,
+        )
+    )
+    rate_limit.print_budgets()
+
+    return _collect(report_date, results, cancelled)
+
+
+def save_report_data(data: ReportData, path: str):
+    with open(path, "wb") as file:
+        pickle.dump(data, file)
+
+
+def load_report_data(path: str) -> Optional[ReportData]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as file:
+        return pickle.load(file)
@@ -0,0 +1,262 @@
+import os
+import threading
+from time import monotonic, time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from common import Service
+import deadline
+
+# requests per second and burst size of the token bucket per service
+SERVICE_RATES = {
+    Service.JIRA: float(os.getenv("JIRA_RATE_LIMIT", "10")),
+    Service.GITHUB: float(os.getenv("GITHUB_RATE_LIMIT", "10")),
+    Service.JENKINS: float(os.getenv("JENKINS_RATE_LIMIT", "20")),
+    Service.CONFLUENCE: float(os.getenv("CONFLUENCE_RATE_LIMIT", "10")),
+}
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+# how many times throttled request is repeated and the longest wait before repeat
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "5"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "300"))
+# part of the server budget below which requests are spread until its reset
+RATE_LIMIT_LOW_WATER = float(os.getenv("RATE_LIMIT_LOW_WATER", "0.1"))
+# wait when server throttles without saying for how long
+DEFAULT_THROTTLE_WAIT = 30.0
+
+# github counts requests against separate budgets (X-RateLimit-Resource)
+DEFAULT_RESOURCE = "core"
+GITHUB_RESOURCES = {
+    "/search/": "search",
+    "/graphql": "graphql",
+}
+
+
+def _parse_reset(value: str) -> Optional[float]:
+    # github sends epoch seconds, jira sends ISO timestamp
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    # either amount of seconds or HTTP date
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        return parsedate_to_datetime(value).timestamp() - time()
+    except (TypeError, ValueError):
+        return None
+
+
+class Budget:
+    # server budget of one rate limit resource (github: core, search, graphql),
+    # requests are paced by its own token bucket only when budget is low
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.rate: Optional[float] = None
+        self.tokens = 1.0
+        self.blocked_until = 0.0
+        self._updated_at = monotonic()
+
+    def refill(self):
+        now = monotonic()
+        if self.rate is not None:
+            self.tokens = min(1.0, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def update_rate(self, base_rate: float):
+        # spread the rest of the budget until reset instead of burning it at once,
+        # but only after it falls below the low-water mark
+        if self.remaining is None or self.limit is None or self.reset_at is None:
+            self.rate = None
+            return
+
+        seconds_to_reset = self.reset_at - time()
+        if seconds_to_reset > 0 and self.remaining < self.limit * RATE_LIMIT_LOW_WATER:
+            self.rate = min(base_rate, max(self.remaining, 1) / seconds_to_reset)
+        else:
+            self.rate = None
+
+
+class RateLimiter:
+    def __init__(self, service: Service, rate: float, burst: int, max_concurrency: int):
+        self.service = service
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.active = 0
+        self.budgets: Dict[str, Budget] = {}
+        self._successes = 0
+        self._updated_at = monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def resource(self, request: requests.PreparedRequest) -> str:
+        # rate limit resource which the request is counted against
+        if self.service != Service.GITHUB:
+            return DEFAULT_RESOURCE
+
+        path = urlparse(request.url).path
+        for prefix, resource in GITHUB_RESOURCES.items():
+            if path.startswith(prefix):
+                return resource
+        return DEFAULT_RESOURCE
+
+    def acquire(self, resource: str = DEFAULT_RESOURCE):
+        with self._condition:
+            budget = self.budgets.setdefault(resource, Budget())
+
+            while True:
+                # waits are woken up every second to stop requests of abandoned stage
+                deadline.check_cancelled()
+
+                self._refill()
+                budget.refill()
+                now = monotonic()
+
+                if now < budget.blocked_until:
+                    self._condition.wait(min(budget.blocked_until - now, 1.0))
+                elif self.active >= self.concurrency:
+                    self._condition.wait(1.0)
+                elif self.tokens < 1:
+                    self._condition.wait(min((1 - self.tokens) / self.rate, 1.0))
+                elif budget.rate is not None and budget.tokens < 1:
+                    self._condition.wait(min((1 - budget.tokens) / budget.rate, 1.0))
+                else:
+                    self.tokens -= 1
+                    if budget.rate is not None:
+                        budget.tokens -= 1
+                    self.active += 1
+                    return
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def update(self, response: requests.Response) -> Optional[float]:
+        # returns delay before retry if request was throttled
+        headers = response.headers
+
+        with self._condition:
+            # responses without resource header are counted against the requested one
+            resource = headers.get(
+                "X-RateLimit-Resource", self.resource(response.request)
+            )
+            budget = self.budgets.setdefault(resource, Budget())
+
+            if "X-RateLimit-Limit" in headers:
+                budget.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                budget.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                budget.reset_at = _parse_reset(headers["X-RateLimit-Reset"])
+
+            retry_after = None
+            if "Retry-After" in headers:
+                retry_after = _parse_retry_after(headers["Retry-After"])
+
+            throttled = response.status_code == HTTPStatus.TOO_MANY_REQUESTS or (
+                response.status_code == HTTPStatus.FORBIDDEN
+                and (budget.remaining == 0 or retry_after is not None)
+            )
+
+            if throttled:
+                # multiplicative decrease of concurrency
+                self.concurrency = max(1, self.concurrency // 2)
+                self._successes = 0
+
+                if retry_after is None and budget.reset_at is not None:
+                    retry_after = budget.reset_at - time()
+                delay = max(0.0, retry_after if retry_after is not None else DEFAULT_THROTTLE_WAIT)
+
+                budget.blocked_until = monotonic() + delay
+                self._condition.notify_all()
+                return delay
+
+            # additive increase of concurrency
+            self._successes += 1
+            if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._successes = 0
+
+            budget.update_rate(self.rate)
+
+            self._condition.notify_all()
+            return None
+
+    def budget(self) -> Dict:
+        with self._condition:
+            self._refill()
+            return {
+                "resources": {
+                    resource: {
+                        "remaining": budget.remaining,
+                        "reset_in": None
+                        if budget.reset_at is None
+                        else max(0, round(budget.reset_at - time())),
+                        "rate": None if budget.rate is None else round(budget.rate, 2),
+                    }
+                    for resource, budget in self.budgets.items()
+                },
+                "tokens": round(self.tokens, 2),
+                "concurrency": self.concurrency,
+                "active": self.active,
+            }
+
+
+_limiters: Dict[Service, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(service: Service, max_concurrency: int) -> RateLimiter:
+    with _limiters_lock:
+        if service not in _limiters:
+            _limiters[service] = RateLimiter(
+                service, SERVICE_RATES[service], RATE_LIMIT_BURST, max_concurrency
+            )
+        return _limiters[service]
+
+
+def get_budget(service: Service) -> Optional[Dict]:
+    with _limiters_lock:
+        limiter = _limiters.get(service)
+    return None if limiter is None else limiter.budget()
+
+
+def print_budgets():
+    for service in Service:
+        budget = get_budget(service)
+        if budget is None:
+            continue
+        for resource, resource_budget in budget["resources"].items():
+            print(
+                "{service} {resource} budget: remaining={remaining}, reset in={reset_in}s, rate={rate}/s, concurrency={concurrency}".format(
+                    service=service.name.capitalize(),
+                    resource=resource,
+                    concurrency=budget["concurrency"],
+                    **resource_budget,
+                )
+            )
@@ -0,0 +1,170 @@
+import os
+import csv
+from datetime import date
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from common import Projects, IssueType
+from open_issues import ISSUES_PLOT_BUCKET
+
+if TYPE_CHECKING:
+    from prefetch import ReportData
+
+SNAPSHOTS_PATH = os.getenv("SNAPSHOTS_PATH", "./snapshots.csv")
+
+# values of one project in one report (empty if source wasn't fetched),
+# open blockers/crits are the same as points of issues plots:
+# amount of issues open at any moment of the bucket which ends at the snapshot date
+SNAPSHOT_FIELDS = ["open_blockers", "open_crits", "new_bugs", "merged_prs"]
+# bucket size of open issues amounts (values of other bucket sizes aren't used in plots)
+BUCKET_FIELD = "bucket"
+
+ISSUE_TYPE_FIELDS = {
+    IssueType.BLOCKER: "open_blockers",
+    IssueType.CRITICAL: "open_crits",
+}
+
+# {project: {snapshot date: {field: value or None}}}
+Snapshots = Dict[Projects, Dict[date, Dict[str, Optional[int]]]]
+
+
+def load_snapshots(path: str = SNAPSHOTS_PATH) -> Snapshots:
+    snapshots: Snapshots = {}
+    if not os.path.exists(path):
+        return snapshots
+
+    with open(path, "r", newline="") as file:
+        for row in csv.DictReader(file):
+            snapshot_date = date.fromisoformat(row["date"])
+            values = {
+                name: int(row[name]) if row[name] else None for name in SNAPSHOT_FIELDS
+            }
+            # snapshots without bucket contain amounts of issues open at the report time
+            values[BUCKET_FIELD] = row.get(BUCKET_FIELD) or None
+            snapshots.setdefault(Projects[row["project"]], {})[snapshot_date] = values
+
+    return snapshots
+
+
+def save_snapshots(snapshots: Snapshots, path: str = SNAPSHOTS_PATH):
+    rows = sorted(
+        (snapshot_date, project.name, values)
+        for project, project_snapshots in snapshots.items()
+        for snapshot_date, values in project_snapshots.items()
+    )
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["date", "project"] + SNAPSHOT_FIELDS + [BUCKET_FIELD])
+        for snapshot_date, project_name, values in rows:
+            writer.writerow(
+                [snapshot_date.isoformat(), project_name]
+                + ["" if values[name] is None else values[name] for name in SNAPSHOT_FIELDS]
+                + [values[BUCKET_FIELD] or ""]
+            )
+    os.replace(tmp_path, path)
+
+
+def _open_issues(data: "ReportData", project: Projects, issue_type: IssueType) -> Optional[int]:
+    # the last point of the plot (its bucket ends at the report date)
+    statistic = data.issues_statistic.get(project, {}).get(issue_type)
+    return statistic[1][-1] if statistic else None
+
+
+def take_snapshot(data: "ReportData") -> Dict[Projects, Dict[str, Optional[int]]]:
+    # exact values of the report (sources which weren't fetched are empty)
+    snapshot = {}
+    for project in Projects:
+        values = {
+            "open_blockers": _open_issues(data, project, IssueType.BLOCKER),
+            "open_crits": _open_issues(data, project, IssueType.CRITICAL),
+            "new_bugs": data.bugs[project]["count"] if project in data.bugs else None,
+            "merged_prs": data.merged_prs[project]["count"]
+            if project in data.merged_prs
+            else None,
+        }
+        if any(value is not None for value in values.values()):
+            has_issues = any(values[name] is not None for name in ISSUE_TYPE_FIELDS.values())
+            values[BUCKET_FIELD] = ISSUES_PLOT_BUCKET if has_issues else None
+            snapshot[project] = values
+
+    return snapshot
+
+
+def _record_past_buckets(snapshots: Snapshots, data: "ReportData"):
+    # plot points of past buckets which weren't recorded yet are kept as well,
+    # so next reports request jira history only for new buckets
+    for project, issues_statistic in data.issues_statistic.items():
+        project_snapshots = snapshots.setdefault(project, {})
+        for issue_type, (intervals, counts) in issues_statistic.items():
+            name = ISSUE_TYPE_FIELDS[issue_type]
+            for interval_end, count in zip(intervals[:-1], counts[:-1]):
+                values = project_snapshots.setdefault(
+                    interval_end,
+                    {**{field: None for field in SNAPSHOT_FIELDS}, BUCKET_FIELD: None},
+                )
+                if values[BUCKET_FIELD] != ISSUES_PLOT_BUCKET:
+                    # amounts of other measure are dropped
+                    for field in ISSUE_TYPE_FIELDS.values():
+                        values[field] = None
+                    values[BUCKET_FIELD] = ISSUES_PLOT_BUCKET
+                if values[name] is None:
+                    values[name] = count
+
+
+def update_snapshots(data: "ReportData", path: str = SNAPSHOTS_PATH):
+    # store snapshot of just fetched data (values of the same day are replaced by fetched ones,
+    # sources which weren't fetched keep their values) and attach the whole history to data
+    snapshots = load_snapshots(path)
+
+    _record_past_buckets(snapshots, data)
+
+    snapshot_date = data.report_date.date()
+    for project, values in take_snapshot(data).items():
+        recorded = snapshots.setdefault(project, {}).setdefault(
+            snapshot_date, {**{name: None for name in SNAPSHOT_FIELDS}, BUCKET_FIELD: None}
+        )
+        if values[BUCKET_FIELD] is not None:
+            recorded[BUCKET_FIELD] = values[BUCKET_FIELD]
+            for name in ISSUE_TYPE_FIELDS.values():
+                recorded[name] = values[name]
+        for name in SNAPSHOT_FIELDS:
+            if values[name] is not None:
+                recorded[name] = values[name]
+
+    save_snapshots(snapshots, path)
+    data.snapshots = snapshots
+
+
+def get_recorded_counts(
+    snapshots: Snapshots,
+    project: Projects,
+    issue_type: IssueType,
+    buckets: List[Tuple[date, date]],
+) -> List[Optional[int]]:
+    # recorded plot points of past buckets (None if bucket should be counted from jira history),
+    # the last bucket ends at the report date, so it's always counted again
+    project_snapshots = snapshots.get(project, {})
+    name = ISSUE_TYPE_FIELDS[issue_type]
+
+    counts: List[Optional[int]] = []
+    for _, bucket_end in buckets[:-1]:
+        values = project_snapshots.get(bucket_end)
+        if values is not None and values[BUCKET_FIELD] == ISSUES_PLOT_BUCKET:
+            counts.append(values[name])
+        else:
+            counts.append(None)
+
+    return counts + [None]
+
+
+if __name__ == "__main__":
+    for project, project_snapshots in load_snapshots().items():
+        print(project.name + ":")
+        for snapshot_date in sorted(project_snapshots):
+            values = project_snapshots[snapshot_date]
+            print(
+                "\t{date}: {values}".format(
+                    date=snapshot_date.strftime("%d-%m-%Y"),
+                    values=", ".join(f"{name}={values[name]}" for name in SNAPSHOT_FIELDS),
+                )
+            )
@@ -3,25 +3,23 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from time import sleep
 from jenkins_export import get_wml_report_link
+import deadline
 from PIL import Image
 
 
 JENKINS_HOST = os.getenv("JENKINS_HOST", "rpr.cis.luxoft.com")
-JENKINS_USERNAME = os.environ["JENKINS_USERNAME"]
-JENKINS_TOKEN = os.environ["JENKINS_PASSWORD"]
 
 
 def login(driver: webdriver.Firefox, wml_rep_url: str):
     driver.get(wml_rep_url)
-    driver.find_element(By.ID, "j_username").send_keys(JENKINS_USERNAME)
-    driver.find_element(By.ID, "j_password").send_keys(JENKINS_TOKEN)
+    driver.find_element(By.ID, "j_username").send_keys(os.environ["JENKINS_USERNAME"])
+    driver.find_element(By.ID, "j_password").send_keys(os.environ["JENKINS_PASSWORD"])
     driver.find_element(By.XPATH, "//button[@type='submit']").click()
 
     # waiting for report page to load
     while not driver.find_elements(By.XPATH, "//span[text()='Allure']"):
-        sleep(1)
+        deadline.sleep(1)
 
 
 def _save_chart_screenshot(driver):
@@ -56,17 +54,17 @@ def export_wml_chart():
     driver = webdriver.Firefox(executable_path="./geckodriver.exe")
     driver.set_window_size(1920,1080)
 
-    report_link = get_wml_report_link()
-    login(driver, report_link)
+    # browser is closed even if export is cancelled by deadline
+    try:
+        report_link = get_wml_report_link()
+        login(driver, report_link)
 
-    # wait for chart to render
-    sleep(2) # animation on the circle chart
+        # wait for chart to render
+        deadline.sleep(2) # animation on the circle chart
 
-    img_path = _save_chart_screenshot(driver)
-
-    driver.close()
-
-    return img_path
+        return _save_chart_screenshot(driver)
+    finally:
+        driver.close()
 
 
 if __name__ == "__main__":